@@ -5,7 +5,7 @@ from sqlalchemy import engine_from_config, pool
 
 from app.core.config import settings
 from app.db.base import Base
-from app.models import user, workout, sync_op  # noqa: F401  (ensure models are imported)
+from app.models import user, workout, sync_op, rollup, sync_state  # noqa: F401  (ensure models are imported)
 
 config = context.config
 
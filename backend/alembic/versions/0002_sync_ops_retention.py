@@ -0,0 +1,23 @@
+"""sync_ops retention index
+
+Revision ID: 0002_sync_ops_retention
+Revises: 0001_init
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0002_sync_ops_retention"
+down_revision = "0001_init"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_sync_ops_applied_at", "sync_ops", ["applied_at"], unique=False)
+
+
+def downgrade():
+    op.drop_index("ix_sync_ops_applied_at", table_name="sync_ops")
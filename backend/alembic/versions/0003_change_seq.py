@@ -0,0 +1,43 @@
+"""workouts change sequence
+
+Revision ID: 0003_change_seq
+Revises: 0002_sync_ops_retention
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0003_change_seq"
+down_revision = "0002_sync_ops_retention"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE SEQUENCE sync_change_seq AS bigint")
+    op.add_column("workouts", sa.Column("change_seq", sa.BigInteger(), nullable=True))
+
+    # Number existing rows in the order the old updated_at cursor saw them.
+    op.execute("""
+        UPDATE workouts AS w
+        SET change_seq = o.seq
+        FROM (
+            SELECT id, nextval('sync_change_seq') AS seq
+            FROM (SELECT id FROM workouts ORDER BY updated_at, id) AS ordered
+        ) AS o
+        WHERE w.id = o.id
+    """)
+
+    op.alter_column(
+        "workouts",
+        "change_seq",
+        nullable=False,
+        server_default=sa.text("nextval('sync_change_seq')"),
+    )
+
+
+def downgrade():
+    op.drop_column("workouts", "change_seq")
+    op.execute("DROP SEQUENCE IF EXISTS sync_change_seq")
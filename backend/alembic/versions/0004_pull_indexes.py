@@ -0,0 +1,42 @@
+"""pull range-scan indexes
+
+Revision ID: 0004_pull_indexes
+Revises: 0003_change_seq
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0004_pull_indexes"
+down_revision = "0003_change_seq"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Built concurrently so existing deployments keep serving sync traffic.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_workouts_user_id_change_seq",
+            "workouts",
+            ["user_id", "change_seq"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_workouts_user_id_updated_at",
+            "workouts",
+            ["user_id", "updated_at"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        # user_id is the leading column of both indexes above.
+        op.drop_index("ix_workouts_user_id", table_name="workouts", postgresql_concurrently=True)
+
+
+def downgrade():
+    op.create_index("ix_workouts_user_id", "workouts", ["user_id"], unique=False)
+    op.drop_index("ix_workouts_user_id_updated_at", table_name="workouts")
+    op.drop_index("ix_workouts_user_id_change_seq", table_name="workouts")
@@ -0,0 +1,60 @@
+"""workout_sets change sequence
+
+Revision ID: 0005_workout_sets_change_seq
+Revises: 0004_pull_indexes
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0005_workout_sets_change_seq"
+down_revision = "0004_pull_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Same sequence as workouts, so a single pull cursor covers both tables.
+    op.add_column("workout_sets", sa.Column("change_seq", sa.BigInteger(), nullable=True))
+    op.execute("""
+        UPDATE workout_sets AS s
+        SET change_seq = o.seq
+        FROM (
+            SELECT id, nextval('sync_change_seq') AS seq
+            FROM (SELECT id FROM workout_sets ORDER BY updated_at, id) AS ordered
+        ) AS o
+        WHERE s.id = o.id
+    """)
+    op.alter_column(
+        "workout_sets",
+        "change_seq",
+        nullable=False,
+        server_default=sa.text("nextval('sync_change_seq')"),
+    )
+
+    # Built concurrently, as in 0004, so existing deployments keep serving sync traffic.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_workout_sets_user_id_change_seq",
+            "workout_sets",
+            ["user_id", "change_seq"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_workout_sets_user_id_updated_at",
+            "workout_sets",
+            ["user_id", "updated_at"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_workout_sets_user_id", table_name="workout_sets", postgresql_concurrently=True)
+
+
+def downgrade():
+    op.create_index("ix_workout_sets_user_id", "workout_sets", ["user_id"], unique=False)
+    op.drop_index("ix_workout_sets_user_id_updated_at", table_name="workout_sets")
+    op.drop_index("ix_workout_sets_user_id_change_seq", table_name="workout_sets")
+    op.drop_column("workout_sets", "change_seq")
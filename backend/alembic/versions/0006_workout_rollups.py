@@ -0,0 +1,38 @@
+"""workout rollups
+
+Revision ID: 0006_workout_rollups
+Revises: 0005_workout_sets_change_seq
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0006_workout_rollups"
+down_revision = "0005_workout_sets_change_seq"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Starts empty; fill it with `python -m app.cli backfill-rollups` after
+    # deploying. Pushes in between are safe: the backfill rebuilds each user
+    # from scratch under the same lock push takes.
+    op.create_table(
+        "workout_rollups",
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("period", sa.String(length=8), nullable=False),
+        sa.Column("period_start", sa.Date(), nullable=False),
+        sa.Column("type", postgresql.ENUM("run", "lift", name="workout_type", create_type=False), nullable=False),
+        sa.Column("workout_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("distance_m", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("duration_s", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("rpe_sum", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("rpe_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("user_id", "period", "period_start", "type"),
+    )
+
+
+def downgrade():
+    op.drop_table("workout_rollups")
@@ -0,0 +1,51 @@
+"""tombstone compaction
+
+Revision ID: 0007_tombstone_compaction
+Revises: 0006_workout_rollups
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0007_tombstone_compaction"
+down_revision = "0006_workout_rollups"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # High-water marks of what compaction has hard-deleted per user; pull
+    # compares client cursors against them.
+    op.create_table(
+        "user_sync_state",
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("purged_seq", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("purged_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+    # Partial, so they only hold tombstones and stay small.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_workouts_user_id_deleted_at",
+            "workouts",
+            ["user_id", "deleted_at"],
+            unique=False,
+            postgresql_where=sa.text("deleted_at IS NOT NULL"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_workout_sets_user_id_deleted_at",
+            "workout_sets",
+            ["user_id", "deleted_at"],
+            unique=False,
+            postgresql_where=sa.text("deleted_at IS NOT NULL"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    op.drop_index("ix_workout_sets_user_id_deleted_at", table_name="workout_sets")
+    op.drop_index("ix_workouts_user_id_deleted_at", table_name="workouts")
+    op.drop_table("user_sync_state")
@@ -0,0 +1,40 @@
+"""per-user change watermark
+
+Revision ID: 0008_change_watermark
+Revises: 0007_tombstone_compaction
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008_change_watermark"
+down_revision = "0007_tombstone_compaction"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "user_sync_state",
+        sa.Column("last_change_seq", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+    # Seed it from existing rows; push keeps it current from here on.
+    op.execute(
+        """
+        INSERT INTO user_sync_state (user_id, last_change_seq)
+        SELECT user_id, max(change_seq)
+        FROM (
+            SELECT user_id, change_seq FROM workouts
+            UNION ALL
+            SELECT user_id, change_seq FROM workout_sets
+        ) AS c
+        GROUP BY user_id
+        ON CONFLICT (user_id) DO UPDATE SET
+        last_change_seq = greatest(user_sync_state.last_change_seq, EXCLUDED.last_change_seq)
+        """
+    )
+
+
+def downgrade():
+    op.drop_column("user_sync_state", "last_change_seq")
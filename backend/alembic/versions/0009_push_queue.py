@@ -0,0 +1,45 @@
+"""write-behind push queue in sync_ops
+
+Revision ID: 0009_push_queue
+Revises: 0008_change_watermark
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0009_push_queue"
+down_revision = "0008_change_watermark"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE SEQUENCE sync_op_queue_seq AS bigint")
+    # A queued op is a row with applied_at NULL; applying it sets applied_at
+    # and outcome and clears payload.
+    op.alter_column("sync_ops", "applied_at", nullable=True)
+    op.add_column("sync_ops", sa.Column("payload", postgresql.JSONB(), nullable=True))
+    op.add_column("sync_ops", sa.Column("queue_seq", sa.BigInteger(), nullable=True))
+    op.add_column("sync_ops", sa.Column("queued_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("sync_ops", sa.Column("outcome", postgresql.JSONB(), nullable=True))
+    op.create_index(
+        "ix_sync_ops_queued",
+        "sync_ops",
+        ["user_id", "queue_seq"],
+        unique=False,
+        postgresql_where=sa.text("applied_at IS NULL"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_sync_ops_queued", table_name="sync_ops")
+    # ops still queued were never applied; the clients will resend them
+    op.execute("DELETE FROM sync_ops WHERE applied_at IS NULL")
+    op.drop_column("sync_ops", "outcome")
+    op.drop_column("sync_ops", "queued_at")
+    op.drop_column("sync_ops", "queue_seq")
+    op.drop_column("sync_ops", "payload")
+    op.alter_column("sync_ops", "applied_at", nullable=False)
+    op.execute("DROP SEQUENCE IF EXISTS sync_op_queue_seq")
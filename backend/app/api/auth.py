@@ -1,32 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException
+import uuid
+
+from fastapi import APIRouter, HTTPException, status
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
-from app.core.security import create_access_token, hash_password, verify_password
-from app.db.session import get_db
+from app.core.config import settings
+from app.core.security import (
+    HashingOverloaded,
+    create_access_token,
+    hash_password,
+    password_hasher,
+    verify_and_update_password,
+)
+from app.db.session import run_db
 from app.models.user import User
 from app.schemas.auth import SignupIn, TokenOut
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-@router.post("/signup", response_model=TokenOut)
-def signup(data: SignupIn, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == data.email).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
+def _find_user(db: Session, email: str) -> User | None:
+    return db.query(User).filter(User.email == email).first()
 
-    user = User(email=data.email, hashed_password=hash_password(data.password))
+def _create_user(db: Session, email: str, hashed_password: str) -> User:
+    user = User(email=email, hashed_password=hashed_password)
     db.add(user)
     db.commit()
     db.refresh(user)
+    return user
+
+def _update_password_hash(db: Session, user_id: uuid.UUID, old_hash: str, new_hash: str) -> None:
+    # Conditional, so a concurrent password change isn't overwritten.
+    db.execute(
+        text("UPDATE users SET hashed_password = :new WHERE id = :id AND hashed_password = :old"),
+        {"id": str(user_id), "old": old_hash, "new": new_hash},
+    )
+    db.commit()
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-ins right now, retry shortly",
+        headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+    )
+
+@router.post("/signup", response_model=TokenOut)
+async def signup(data: SignupIn):
+    existing = await run_db(_find_user, data.email)
+    if existing:
+        raise HTTPException(status_code=400, detail="Email already registered")
+
+    try:
+        hashed = await password_hasher.run(hash_password, data.password)
+    except HashingOverloaded:
+        raise _busy()
+    user = await run_db(_create_user, data.email, hashed)
 
     token = create_access_token(subject=str(user.id))
     return TokenOut(access_token=token)
 
 @router.post("/login", response_model=TokenOut)
-def login(data: SignupIn, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == data.email).first()
-    if not user or not verify_password(data.password, user.hashed_password):
+async def login(data: SignupIn):
+    user = await run_db(_find_user, data.email)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+
+    try:
+        valid, new_hash = await password_hasher.run(verify_and_update_password, data.password, user.hashed_password)
+    except HashingOverloaded:
+        raise _busy()
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    if new_hash is not None:
+        await run_db(_update_password_hash, user.id, user.hashed_password, new_hash)
 
     token = create_access_token(subject=str(user.id))
     return TokenOut(access_token=token)
@@ -1,11 +1,15 @@
 import uuid
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from app.core.auth_cache import principal_cache
 from app.core.config import settings
-from app.db.session import SessionLocal
+from app.core.metrics import stage
+from app.core.ratelimit import RateLimited, sync_rate_limiter
+from app.db.session import SessionLocal, run_db
 from app.models.user import User
 
 bearer_scheme = HTTPBearer(auto_error=False)
@@ -17,8 +21,82 @@ def get_db():
     finally:
         db.close()
 
-def get_current_user(
-    db: Session = Depends(get_db),
+def _decode_token(token: str) -> dict:
+    try:
+        with stage("auth.jwt"):
+            payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
+    except JWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    if not payload.get("sub"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token missing subject")
+    return payload
+
+def _lookup_user_id(db: Session, sub: str, allow_email: bool) -> uuid.UUID:
+    # sub might be uuid (recommended) or, where allow_email, an email
+    row = None
+    try:
+        row = db.execute(text("SELECT id FROM users WHERE id = :id"), {"id": str(uuid.UUID(sub))}).fetchone()
+    except ValueError:
+        if not allow_email:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    if row is None and allow_email:
+        # treat as email
+        row = db.execute(text("SELECT id FROM users WHERE email = :email"), {"email": sub}).fetchone()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    return uuid.UUID(str(row[0]))
+
+async def resolve_user_id(token: str, allow_email: bool = True) -> uuid.UUID:
+    """
+    The token's user. The sync endpoints have always also taken an email as
+    the subject; get_current_user only ever took a user id (allow_email=False).
+    """
+    user_id = principal_cache.get(token)
+    if user_id is not None:
+        return user_id
+
+    payload = _decode_token(token)
+    sub = str(payload["sub"])
+    with stage("auth.user_lookup"):
+        user_id = await run_db(_lookup_user_id, sub, allow_email)
+    # Only tokens whose subject is the user id are cached, so a hit is good
+    # for either kind of caller.
+    if str(user_id) == sub.lower():
+        principal_cache.put(token, user_id, payload.get("exp"))
+    return user_id
+
+async def get_current_user_id(authorization: str | None = Header(default=None)) -> uuid.UUID:
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Missing/invalid Authorization header",
+        )
+
+    token = authorization.split(" ", 1)[1].strip()
+    return await resolve_user_id(token)
+
+def rate_limited(kind: str):
+    """
+    Dependency: the caller's user id, after charging the request to their
+    `kind` budget in sync_rate_limiter. Over budget, 429 with Retry-After.
+    """
+    async def dependency(user_id: uuid.UUID = Depends(get_current_user_id)) -> uuid.UUID:
+        try:
+            await sync_rate_limiter.check(user_id, kind)
+        except RateLimited as exc:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Too many {kind} requests, retry later",
+                headers={"Retry-After": str(exc.retry_after)},
+            )
+        return user_id
+
+    return dependency
+
+def _get_user(db: Session, user_id: uuid.UUID) -> User | None:
+    return db.get(User, user_id)
+
+async def get_current_user(
     creds: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
 ) -> User:
     # ✅ This produces your exact error message when header is missing
@@ -28,18 +106,10 @@ def get_current_user(
             detail="Missing/invalid Authorization header",
         )
 
-    token = creds.credentials
-
-    try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
-        sub = payload.get("sub")
-        if not sub:
-            raise ValueError("Missing sub")
-        user_id = uuid.UUID(sub)
-    except (JWTError, ValueError):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    user_id = await resolve_user_id(creds.credentials, allow_email=False)
 
-    user = db.get(User, user_id)
+    user = await run_db(_get_user, user_id)
     if not user:
+        principal_cache.invalidate_user(user_id)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
@@ -0,0 +1,65 @@
+import uuid
+from datetime import date
+from typing import Any, Literal
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+
+from app.api.deps import get_current_user_id
+from app.db.session import run_db
+from app.services.analytics import analytics_cache, change_watermark, compute_lift_analytics, load_set_columns
+from app.services.rollups import read_rollups
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+
+class StatsResponse(BaseModel):
+    period: str
+    buckets: list[dict[str, Any]]
+
+
+class LiftStatsResponse(BaseModel):
+    as_of_seq: int
+    exercises: list[dict[str, Any]]
+
+
+@router.get("", response_model=StatsResponse)
+async def stats(
+    period: Literal["week", "month"] = Query("week"),
+    start: date | None = Query(None, alias="from", description="First period start to include (inclusive)"),
+    end: date | None = Query(None, alias="to", description="Period starts before this date (exclusive)"),
+    type: Literal["run", "lift"] | None = Query(None),
+    user_id: uuid.UUID = Depends(get_current_user_id),
+):
+    """
+    Weekly or monthly totals per workout type, read from the rollup table
+    push keeps up to date: one row per period and type, however many
+    workouts the user has. Periods are UTC; weeks start on Monday.
+    """
+    buckets = await run_db(read_rollups, user_id, period, start, end, type)
+    return StatsResponse(period=period, buckets=buckets)
+
+
+@router.get("/lifts", response_model=LiftStatsResponse)
+async def lift_stats(
+    exercise: str | None = Query(None, description="Only this exercise (case-insensitive)"),
+    user_id: uuid.UUID = Depends(get_current_user_id),
+):
+    """
+    Per-exercise PRs, weekly tonnage and weekly best estimated 1RM (Epley,
+    sets of up to 12 reps). Computed over all of the user's sets at once and
+    cached until any of their sets or workouts change.
+    """
+    watermark = await run_db(change_watermark, user_id)
+    exercises = analytics_cache.get(user_id, watermark)
+    if exercises is None:
+        watermark, cols = await run_db(load_set_columns, user_id)
+        # CPU-bound; keep it off the event loop in both DB modes.
+        exercises = await run_in_threadpool(compute_lift_analytics, cols)
+        analytics_cache.put(user_id, watermark, exercises)
+
+    if exercise is not None:
+        name = exercise.strip().lower()
+        exercises = [e for e in exercises if e["exercise"] == name]
+    return LiftStatsResponse(as_of_seq=watermark, exercises=exercises)
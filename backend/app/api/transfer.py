@@ -0,0 +1,210 @@
+import tempfile
+import uuid
+import zlib
+from typing import Any, AsyncIterator, BinaryIO, Iterator
+
+import psycopg
+from psycopg import sql
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user_id
+from app.core.config import settings
+from app.core.encoding import NDJSON
+from app.db.replica import current_wal_lsn, replica_router
+from app.db.session import AsyncSessionLocal, SessionLocal, run_db
+from app.services.notifications import change_notifier
+from app.services.transfer import (
+    COLUMNS,
+    InvalidImport,
+    TransferFormat,
+    TransferTable,
+    create_staging,
+    csv_columns,
+    export_copy,
+    import_copy,
+    merge_import,
+)
+
+router = APIRouter(tags=["transfer"])
+
+_SNAPSHOT = text("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+_MAX_HEADER_BYTES = 64 * 1024
+_READ_SIZE = 256 * 1024
+
+
+class ImportResponse(BaseModel):
+    workouts: dict[str, int]
+    sets: dict[str, int]
+
+
+def _iter_export(stmts: list[sql.Composed]) -> Iterator[bytes]:
+    with SessionLocal() as db:
+        db.execute(_SNAPSHOT)
+        raw = db.connection().connection.driver_connection
+        with raw.cursor() as cur:
+            for stmt in stmts:
+                with cur.copy(stmt) as copy:
+                    for data in copy:
+                        yield bytes(data)
+
+
+async def _aiter_export(stmts: list[sql.Composed]) -> AsyncIterator[bytes]:
+    async with AsyncSessionLocal() as db:
+        await db.execute(_SNAPSHOT)
+        raw = await (await db.connection()).get_raw_connection()
+        async with raw.driver_connection.cursor() as cur:
+            for stmt in stmts:
+                async with cur.copy(stmt) as copy:
+                    async for data in copy:
+                        yield bytes(data)
+
+
+@router.get("/export")
+async def export(
+    format: TransferFormat = Query("ndjson"),
+    table: TransferTable | None = Query(None, description="Only this table; CSV always holds one (default workouts)"),
+    user_id: uuid.UUID = Depends(get_current_user_id),
+):
+    """
+    The user's live workouts and sets, streamed straight out of Postgres
+    with COPY TO STDOUT (one snapshot across both tables).
+
+    NDJSON lines look like pull's stream: {"kind": "workout" | "workout_set",
+    "data": {...}}, workouts first. CSV is one table with a header row.
+    Either can be fed back to /import.
+    """
+    if format == "csv":
+        tables = [table or "workouts"]
+        media_type, filename = "text/csv; charset=utf-8", f"{tables[0]}.csv"
+    else:
+        tables = [table] if table else list(COLUMNS)
+        media_type, filename = NDJSON, "export.ndjson"
+    stmts = [export_copy(t, format, user_id) for t in tables]
+    stream = _aiter_export if settings.DB_ASYNC else _iter_export
+    return StreamingResponse(
+        stream(stmts), media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+async def _request_body(request: Request) -> AsyncIterator[bytes]:
+    """The upload as it arrives, gunzipped if need be, capped at TRANSFER_MAX_IMPORT_BYTES."""
+    encoding = request.headers.get("content-encoding", "identity").strip().lower()
+    if encoding not in ("identity", "gzip"):
+        raise HTTPException(status_code=415, detail=f"Unsupported Content-Encoding: {encoding}")
+    gunzip = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS) if encoding == "gzip" else None
+    total = 0
+    async for chunk in request.stream():
+        if gunzip is not None:
+            try:
+                chunk = gunzip.decompress(chunk)
+            except zlib.error:
+                raise HTTPException(status_code=400, detail="Invalid gzip body")
+        total += len(chunk)
+        if total > settings.TRANSFER_MAX_IMPORT_BYTES:
+            raise HTTPException(status_code=413, detail="Import too large")
+        if chunk:
+            yield chunk
+
+
+async def _read_header(body: AsyncIterator[bytes]) -> bytes:
+    head = b""
+    while b"\n" not in head:
+        if len(head) > _MAX_HEADER_BYTES:
+            raise InvalidImport("CSV header row too long")
+        chunk = await anext(body, None)
+        if chunk is None:
+            break
+        head += chunk
+    return head
+
+
+def _bad_import(exc: Exception) -> HTTPException:
+    orig = getattr(exc, "orig", None) or exc
+    diag = getattr(orig, "diag", None)
+    detail = (diag.message_primary if diag is not None else None) or str(orig)
+    return HTTPException(status_code=400, detail=f"Import failed: {detail}")
+
+
+def _import_spooled(
+    db: Session, user_id: uuid.UUID, fmt: TransferFormat, table: TransferTable, columns: tuple[str, ...], upload: BinaryIO
+) -> dict[str, Any]:
+    create_staging(db)
+    raw = db.connection().connection.driver_connection
+    with raw.cursor() as cur, cur.copy(import_copy(fmt, table, columns)) as copy:
+        while data := upload.read(_READ_SIZE):
+            copy.write(data)
+    result = merge_import(db, user_id, fmt, table)
+    db.commit()
+    if result["changed"] and replica_router.enabled:
+        result["lsn"] = current_wal_lsn(db)
+    return result
+
+
+async def _import_streaming(
+    user_id: uuid.UUID, fmt: TransferFormat, table: TransferTable, columns: tuple[str, ...], head: bytes, body: AsyncIterator[bytes]
+) -> dict[str, Any]:
+    async with AsyncSessionLocal() as db:
+        await db.run_sync(create_staging)
+        raw = await (await db.connection()).get_raw_connection()
+        async with raw.driver_connection.cursor() as cur:
+            async with cur.copy(import_copy(fmt, table, columns)) as copy:
+                await copy.write(head)
+                async for chunk in body:
+                    await copy.write(chunk)
+        result = await db.run_sync(merge_import, user_id, fmt, table)
+        await db.commit()
+        if result["changed"] and replica_router.enabled:
+            result["lsn"] = await db.run_sync(current_wal_lsn)
+        return result
+
+
+@router.post("/import", response_model=ImportResponse)
+async def import_(
+    request: Request,
+    format: TransferFormat = Query("ndjson"),
+    table: TransferTable = Query("workouts", description="CSV: the table it holds. NDJSON: the table of lines without a kind"),
+    user_id: uuid.UUID = Depends(get_current_user_id),
+):
+    """
+    Bulk-load a file in /export's formats (the body may be gzipped). It is
+    COPYed into per-request staging tables, then merged in one statement per
+    table: new ids are inserted, existing ones replaced only when the file's
+    version is higher, ids owned by someone else and sets whose workout
+    isn't the user's are skipped. All or nothing; a malformed row fails the
+    whole import with 400.
+    """
+    body = _request_body(request)
+    try:
+        head, columns = b"", ()
+        if format == "csv":
+            head = await _read_header(body)
+            columns = csv_columns(head.split(b"\n", 1)[0], table)
+
+        if settings.DB_ASYNC:
+            # straight from the socket into COPY
+            result = await _import_streaming(user_id, format, table, columns, head, body)
+        else:
+            # The sync driver can't await the request, so buffer it first;
+            # large uploads spill to disk.
+            with tempfile.SpooledTemporaryFile(max_size=settings.TRANSFER_SPOOL_MEMORY_BYTES) as upload:
+                upload.write(head)
+                async for chunk in body:
+                    upload.write(chunk)
+                upload.seek(0)
+                result = await run_db(_import_spooled, user_id, format, table, columns, upload)
+    except InvalidImport as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except (psycopg.Error, DBAPIError) as exc:
+        raise _bad_import(exc)
+
+    lsn = result.pop("lsn", None)
+    if lsn is not None:
+        replica_router.note_write(user_id, lsn)
+    if result.pop("changed"):
+        await change_notifier.publish(user_id, lsn)
+    return ImportResponse(**result)
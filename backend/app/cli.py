@@ -0,0 +1,136 @@
+"""
+Maintenance commands.
+
+    python -m app.cli prune-sync-ops [--retention-days N]
+    python -m app.cli compact-tombstones [--horizon-days N]
+    python -m app.cli backfill-rollups [--user-id UUID]
+    python -m app.cli check-pull-plan
+    python -m app.cli run-push-queue [--workers N]
+"""
+
+import argparse
+import asyncio
+import sys
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.api.sync import drain_push_queue, pull_query
+from app.core.config import settings
+from app.db.session import SessionLocal, dispose_engine, init_engine
+from app.services.maintenance import compact_tombstones, prune_sync_ops
+from app.services.notifications import change_notifier
+from app.services.push_queue import run_push_queue
+from app.services.rollups import backfill_rollups
+
+
+def _prune_sync_ops(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        n = prune_sync_ops(db, retention_days=args.retention_days)
+    print(f"pruned {n} sync_ops rows")
+
+
+def _compact_tombstones(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        n = compact_tombstones(db, horizon_days=args.horizon_days)
+    print(f"purged {n['workouts']} workouts and {n['workout_sets']} sets for {n['users']} users")
+
+
+def _backfill_rollups(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        users, rows = backfill_rollups(db, user_id=args.user_id)
+    print(f"rebuilt rollups for {users} users ({rows} rows)")
+
+
+def _plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+# The pull query in each shape it runs: (table, by_cursor, params).
+_PULL_PLAN_CASES = {
+    f"{table}/{name}": (table, by_cursor, params)
+    for table in ("workouts", "workout_sets")
+    for name, by_cursor, params in (
+        ("cursor", True, {"after_seq": 0}),
+        ("since", False, {"since_dt": datetime.now(timezone.utc)}),
+    )
+}
+
+
+def _pull_plan(db: Session, table: str, by_cursor: bool, params: dict) -> list[dict]:
+    """Every node of the pull query's plan, with seq scans priced out."""
+    # With seq scans priced out, the planner only falls back to one when no
+    # index can serve the predicate -- which is exactly the regression we
+    # want to catch, independent of how much data the database holds.
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = db.execute(
+        text("EXPLAIN (FORMAT JSON) " + pull_query(table, by_cursor).text),
+        {"user_id": str(uuid.uuid4()), "limit": 501, **params},
+    ).scalar_one()
+    return list(_plan_nodes(plan[0]["Plan"]))
+
+
+def _check_pull_plan(args: argparse.Namespace) -> None:
+    failed = False
+    with SessionLocal() as db:
+        for name, case in _PULL_PLAN_CASES.items():
+            nodes = _pull_plan(db, *case)
+            scans = [f"{n['Node Type']} on {n.get('Index Name') or n.get('Relation Name')}" for n in nodes if "Scan" in n["Node Type"]]
+            ok = not any(n["Node Type"] == "Seq Scan" for n in nodes)
+            failed |= not ok
+            print(f"{'ok  ' if ok else 'FAIL'} pull[{name}]: {', '.join(scans)}")
+    if failed:
+        sys.exit(1)
+
+
+def _run_push_queue(args: argparse.Namespace) -> None:
+    # Workers use run_db like the app does, so they need its engine too.
+    init_engine()
+
+    async def run() -> None:
+        try:
+            await run_push_queue(drain_push_queue, args.workers, settings.SYNC_QUEUE_POLL_SECONDS)
+        finally:
+            await change_notifier.stop()
+            await dispose_engine()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("prune-sync-ops", help="delete remembered op_ids past the retention window")
+    p.add_argument("--retention-days", type=int, default=None)
+    p.set_defaults(func=_prune_sync_ops)
+
+    p = sub.add_parser("compact-tombstones", help="hard-delete tombstones older than the resync horizon")
+    p.add_argument("--horizon-days", type=int, default=None)
+    p.set_defaults(func=_compact_tombstones)
+
+    p = sub.add_parser("backfill-rollups", help="rebuild workout rollups from workouts")
+    p.add_argument("--user-id", type=uuid.UUID, default=None)
+    p.set_defaults(func=_backfill_rollups)
+
+    p = sub.add_parser("check-pull-plan", help="exit non-zero if the pull query plans a seq scan")
+    p.set_defaults(func=_check_pull_plan)
+
+    p = sub.add_parser("run-push-queue", help="apply queued pushes (SYNC_PUSH_MODE=queue) until interrupted")
+    p.add_argument("--workers", type=int, default=max(1, settings.SYNC_QUEUE_WORKERS))
+    p.set_defaults(func=_run_push_queue)
+
+    args = parser.parse_args(argv)
+    init_engine(use_async=False)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.models.user import User
+
+
+class PrincipalCache:
+    """
+    token -> user id, so hot endpoints skip the JWT decode and users lookup.
+
+    Entries live until the token's own exp or ttl_seconds, whichever is
+    sooner; the ttl bounds how long another worker may keep honouring a
+    token for a user deleted elsewhere. Least recently used entries are
+    evicted past max_entries.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[uuid.UUID, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> uuid.UUID | None:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            user_id, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return user_id
+
+    def put(self, token: str, user_id: uuid.UUID, exp: float | None = None) -> None:
+        expires_at = time.time() + self.ttl_seconds
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        with self._lock:
+            self._entries[token] = (user_id, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: uuid.UUID) -> None:
+        with self._lock:
+            stale = [t for t, (uid, _) in self._entries.items() if uid == user_id]
+            for t in stale:
+                del self._entries[t]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache(
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+)
+
+
+@event.listens_for(User, "after_delete")
+def _forget_deleted_user(mapper, connection, target: User) -> None:
+    principal_cache.invalidate_user(target.id)
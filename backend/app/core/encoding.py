@@ -0,0 +1,108 @@
+"""
+Wire formats for the sync endpoints.
+
+Besides plain JSON, clients may ask for (Accept) or send (Content-Type):
+
+- application/msgpack: the same documents, msgpack-encoded. Only offered
+  when the msgpack package is installed.
+- application/vnd.fitness.columnar+json: pull responses with field names
+  sent once and timestamps as epoch-ms integers.
+
+Request bodies may also be gzip-compressed (Content-Encoding: gzip).
+"""
+
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Coroutine
+
+from fastapi import HTTPException, Request, Response
+from fastapi.routing import APIRoute
+
+from app.core.config import settings
+
+try:
+    import msgpack
+except ImportError:  # optional; msgpack is simply not offered without it
+    msgpack = None
+
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+MSGPACK = "application/msgpack"
+COLUMNAR_JSON = "application/vnd.fitness.columnar+json"
+
+_MSGPACK_BODY = "sync.msgpack_body"
+
+
+def negotiate(accept: str | None) -> str:
+    """First media type in Accept that we can produce; JSON otherwise."""
+    for part in (accept or "").split(","):
+        media = part.split(";", 1)[0].strip().lower()
+        if media == MSGPACK and msgpack is not None:
+            return MSGPACK
+        if media in (JSON, NDJSON, COLUMNAR_JSON):
+            return media
+    return JSON
+
+
+def epoch_ms(dt: datetime | None) -> int | None:
+    return None if dt is None else int(dt.timestamp() * 1000)
+
+
+def compact_response(content: dict[str, Any], media_type: str) -> Response:
+    # Bypasses response_model on purpose: the documents are built from
+    # plain lists and ints already, re-validating them is wasted CPU.
+    if media_type == MSGPACK:
+        return Response(msgpack.packb(content), media_type=MSGPACK)
+    return Response(json.dumps(content, separators=(",", ":")).encode(), media_type=media_type)
+
+
+def _gunzip(data: bytes, limit: int) -> bytes:
+    d = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    try:
+        out = d.decompress(data, limit + 1)
+    except zlib.error:
+        raise HTTPException(status_code=400, detail="Invalid gzip body")
+    if len(out) > limit or d.unconsumed_tail:
+        raise HTTPException(status_code=413, detail="Request body too large")
+    return out
+
+
+class SyncRequest(Request):
+    async def body(self) -> bytes:
+        if not hasattr(self, "_decoded_body"):
+            body = await super().body()
+            encoding = self.headers.get("content-encoding", "identity").strip().lower()
+            if encoding == "gzip":
+                body = _gunzip(body, settings.SYNC_MAX_BODY_BYTES)
+            elif encoding != "identity":
+                raise HTTPException(status_code=415, detail=f"Unsupported Content-Encoding: {encoding}")
+            self._decoded_body = body
+        return self._decoded_body
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            body = await self.body()
+            self._json = msgpack.unpackb(body) if self.scope.get(_MSGPACK_BODY) else json.loads(body)
+        return self._json
+
+
+class SyncRoute(APIRoute):
+    """Route class that accepts gzip and msgpack request bodies."""
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            scope = request.scope
+            content_type = request.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+            if content_type == MSGPACK:
+                if msgpack is None:
+                    raise HTTPException(status_code=415, detail="msgpack bodies are not supported by this server")
+                # FastAPI only parses bodies it believes are JSON; relabel the
+                # request and let SyncRequest.json() do the msgpack decoding.
+                headers = [(k, v) for k, v in scope["headers"] if k != b"content-type"]
+                scope = {**scope, "headers": [*headers, (b"content-type", JSON.encode())], _MSGPACK_BODY: True}
+            return await handler(SyncRequest(scope, request.receive))
+
+        return route_handler
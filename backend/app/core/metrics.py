@@ -0,0 +1,350 @@
+import abc
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500, 1000)
+
+
+def _fmt_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labels)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    @abc.abstractmethod
+    def _samples(self) -> list[str]:
+        ...
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self) -> dict[tuple[str, ...], float]:
+        """Current totals by label values, in `labels` order."""
+        with self._lock:
+            return dict(self._values)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labels, k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labels, k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[i] += 1
+            total[0] += value
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, (list(c), t[0])) for k, (c, t) in self._values.items())
+        out = []
+        for key, (counts, total) in items:
+            running = 0
+            for bound, n in zip((*self.buckets, float("inf")), counts):
+                running += n
+                le = 'le="%s"' % _fmt_value(bound)
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, le)} {running}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labels, key)} {_fmt_value(total)}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labels, key)} {running}")
+        return out
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))  # type: ignore[return-value]
+
+    def gauge(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labels))  # type: ignore[return-value]
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))  # type: ignore[return-value]
+
+    def add_collector(self, fn: Callable[[], None]) -> None:
+        """fn runs before every render, to refresh gauges read from live state."""
+        with self._lock:
+            self._collectors.append(fn)
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+        for fn in collectors:
+            fn()
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for m in metrics for line in m.render()) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "http_requests_total", "Requests served.", ("method", "route", "status")
+)
+http_duration = registry.histogram(
+    "http_request_duration_seconds", "Time from request start to the last body byte.", ("method", "route")
+)
+http_db_queries = registry.histogram(
+    "http_request_db_queries", "SQL statements executed per request.", ("method", "route"), COUNT_BUCKETS
+)
+http_db_seconds = registry.histogram(
+    "http_request_db_seconds", "Time spent in SQL per request.", ("method", "route")
+)
+http_stage_seconds = registry.histogram(
+    "http_request_stage_seconds", "Time per hot-path stage (auth.jwt, auth.user_lookup, serialize, ...).", ("route", "stage")
+)
+sync_push_ops = registry.histogram(
+    "sync_push_ops", "Ops per push request.", (), COUNT_BUCKETS
+)
+sync_push_ops_total = registry.counter(
+    "sync_push_ops_total", "Pushed ops by type and outcome.", ("type", "outcome")
+)
+sync_push_duration = registry.histogram(
+    "sync_push_duration_seconds", "Push apply time by batch size.", ("ops",)
+)
+sync_queue_ops = registry.counter(
+    "sync_queue_ops_total", "Queued push ops applied by the push queue workers, by type and outcome.", ("type", "outcome")
+)
+sync_queue_lag = registry.histogram(
+    "sync_queue_lag_seconds", "Time from a push op being queued to being applied."
+)
+sync_subscribers = registry.gauge(
+    "sync_subscribers", "Devices waiting on change notifications (WebSocket or long-poll)."
+)
+sync_notifications = registry.counter(
+    "sync_notifications_total", "Change notifications published after a push."
+)
+sync_rate_limited = registry.counter(
+    "sync_rate_limited_total", "Sync requests refused with 429 for being over the user's budget.", ("kind",)
+)
+sync_admission_in_flight = registry.gauge(
+    "sync_admission_in_flight", "Sync DB work holding an admission slot."
+)
+sync_admission_rejected = registry.counter(
+    "sync_admission_rejected_total", "Sync requests refused with 503 because no admission slot freed up."
+)
+auth_hash_in_flight = registry.gauge(
+    "auth_hash_in_flight", "Password hash/verify jobs running or queued."
+)
+auth_hash_rejected = registry.counter(
+    "auth_hash_rejected_total", "Hash/verify jobs refused because the queue was full."
+)
+db_replica_reads = registry.counter(
+    "db_replica_reads_total",
+    "Replica-eligible reads by where they were served and why.",
+    ("target", "reason"),
+)
+db_replica_hit_ratio = registry.gauge(
+    "db_replica_hit_ratio", "Share of replica-routable reads served by the replica since start."
+)
+db_replica_fallback_ratio = registry.gauge(
+    "db_replica_fallback_ratio", "Share of replica-routable reads that fell back to the primary since start."
+)
+db_pool_size = registry.gauge(
+    "db_pool_size", "Configured pool_size (max_overflow extra connections may be opened).", ("pool",)
+)
+db_pool_in_use = registry.gauge(
+    "db_pool_in_use", "Connections currently checked out.", ("pool",)
+)
+db_pool_idle = registry.gauge(
+    "db_pool_idle", "Open connections sitting in the pool.", ("pool",)
+)
+db_pool_overflow = registry.gauge(
+    "db_pool_overflow", "Connections open beyond pool_size (negative: not yet opened).", ("pool",)
+)
+db_pool_checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", ("pool",)
+)
+db_pool_timeouts = registry.counter(
+    "db_pool_timeouts_total", "Checkouts that gave up after pool_timeout.", ("pool",)
+)
+
+
+def ops_bucket(n: int) -> str:
+    """Coarse label for a push's op count, so latency can be split by batch size."""
+    for bound in (1, 10, 50, 200, 1000):
+        if n <= bound:
+            return f"le{bound}"
+    return "gt1000"
+
+
+@dataclass
+class RequestMetrics:
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    stages: dict[str, float] = field(default_factory=dict)
+
+
+# Set per request by MetricsMiddleware. Holds a mutable object, so updates
+# made from threadpool workers (which run on a copy of the context) and from
+# AsyncSession.run_sync land on the same record.
+_current: contextvars.ContextVar[RequestMetrics | None] = contextvars.ContextVar("request_metrics", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        current = _current.get()
+        if current is not None:
+            current.stages[name] = current.stages.get(name, 0.0) + time.perf_counter() - start
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    # On the execution context, not the connection: a statement that fails
+    # never reaches after_cursor_execute, and its start time goes with it.
+    if context is not None:
+        context._metrics_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    start = getattr(context, "_metrics_query_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    current = _current.get()
+    if current is not None:
+        current.db_queries += 1
+        current.db_seconds += elapsed
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attribute SQL count and time on this engine to the request being served."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """
+    Per-route latency, status, SQL count/time and stage timings. Routes are
+    labelled by their path template so ids don't blow up cardinality;
+    unmatched paths share one "<unmatched>" label.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        record = RequestMetrics()
+        token = _current.set(record)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            elapsed = time.perf_counter() - start
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            method = scope["method"]
+            http_requests.inc(method=method, route=route, status=str(status_code))
+            http_duration.observe(elapsed, method=method, route=route)
+            http_db_queries.observe(record.db_queries, method=method, route=route)
+            http_db_seconds.observe(record.db_seconds, method=method, route=route)
+            for name, seconds in record.stages.items():
+                http_stage_seconds.observe(seconds, route=route, stage=name)
@@ -0,0 +1,173 @@
+import abc
+import asyncio
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from app.core import metrics
+from app.core.config import settings
+
+
+class RateLimited(Exception):
+    """The caller is over its budget; retry_after is whole seconds until a token frees up."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class Overloaded(Exception):
+    """No admission slot freed up in time; the caller should back off."""
+
+
+def _take(tokens: float, updated_at: float, now: float, rate: float, burst: float) -> tuple[float, float]:
+    """Refill a bucket to now and try to take one token: (tokens left, seconds to wait, 0 if taken)."""
+    tokens = min(burst, tokens + max(0.0, now - updated_at) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class RateLimitBackend(abc.ABC):
+    """
+    Where the token buckets live. take() returns 0 if the request is
+    admitted, otherwise how many seconds until it would be.
+    """
+
+    @abc.abstractmethod
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        ...
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    Buckets in this process only, so with N workers a user effectively gets
+    N times the budget. Least recently used keys are dropped past max_keys;
+    a dropped bucket comes back full, which only ever errs towards admitting.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (burst, now))
+            tokens, wait = _take(tokens, updated_at, now, rate, burst)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    """
+    Buckets in a SQLite file, so every worker process on the host shares one
+    budget per user. Stands in for a networked store (Redis and the like)
+    where a single host is all there is; a backend for one only needs take().
+
+    Each take() is one short IMMEDIATE transaction, run off the event loop.
+    """
+
+    _PRUNE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")  # losing buckets in a crash just refills them
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._takes = 0
+
+    def _take_sync(self, key: str, rate: float, burst: float) -> float:
+        with self._lock:
+            now = time.time()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+                tokens, wait = _take(*(row or (burst, now)), now, rate, burst)
+                self._conn.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (key, tokens, now))
+                self._takes += 1
+                if self._takes % self._PRUNE_EVERY == 0:
+                    # Idle long enough to have refilled completely: same as absent.
+                    self._conn.execute("DELETE FROM buckets WHERE updated_at < ? - ? / ?", (now, burst, rate))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        return await asyncio.to_thread(self._take_sync, key, rate, burst)
+
+
+class RateLimiter:
+    """Per-user token buckets, one budget per kind of request ("push", "pull")."""
+
+    def __init__(self, backend: RateLimitBackend | None, budgets: dict[str, tuple[float, float]]):
+        # budgets: kind -> (requests per minute, burst)
+        self.backend = backend
+        self.budgets = budgets
+
+    async def check(self, user_id: object, kind: str) -> None:
+        if self.backend is None:
+            return
+        per_minute, burst = self.budgets[kind]
+        wait = await self.backend.take(f"{kind}:{user_id}", per_minute / 60.0, burst)
+        if wait > 0:
+            metrics.sync_rate_limited.inc(kind=kind)
+            raise RateLimited(max(1, math.ceil(wait)))
+
+
+class AdmissionGate:
+    """
+    Caps the DB work in flight in this process. Callers beyond the cap wait
+    up to wait_seconds for a slot and then get Overloaded, so a burst sheds
+    quickly instead of queueing on the connection pool until DB_POOL_TIMEOUT.
+    """
+
+    def __init__(self, limit: int, wait_seconds: float):
+        self.limit = limit
+        self.wait_seconds = wait_seconds
+        self._slots = asyncio.Semaphore(limit)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.wait_seconds)
+        except TimeoutError:
+            metrics.sync_admission_rejected.inc()
+            raise Overloaded()
+        metrics.sync_admission_in_flight.inc()
+        try:
+            yield
+        finally:
+            metrics.sync_admission_in_flight.dec()
+            self._slots.release()
+
+
+def make_rate_limiter(backend: str) -> RateLimiter:
+    budgets = {
+        "push": (settings.SYNC_PUSH_RATE_PER_MINUTE, settings.SYNC_PUSH_BURST),
+        "pull": (settings.SYNC_PULL_RATE_PER_MINUTE, settings.SYNC_PULL_BURST),
+    }
+    if backend == "memory":
+        return RateLimiter(MemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS), budgets)
+    if backend == "sqlite":
+        return RateLimiter(SQLiteRateLimitBackend(settings.RATE_LIMIT_SQLITE_PATH), budgets)
+    if backend == "off":
+        return RateLimiter(None, budgets)
+    raise ValueError(f"unknown RATE_LIMIT_BACKEND {backend!r}")
+
+
+sync_rate_limiter = make_rate_limiter(settings.RATE_LIMIT_BACKEND)
+db_admission = AdmissionGate(settings.SYNC_MAX_IN_FLIGHT, settings.SYNC_ADMISSION_WAIT_SECONDS)
@@ -1,13 +1,27 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 import os
+from typing import Any, Callable, TypeVar
 
 from jose import jwt
 from passlib.context import CryptContext
 
+from app.core import metrics
+from app.core.config import settings
+
+T = TypeVar("T")
+
 # ----- Password hashing -----
+# min == max == default rounds, so any hash made with a different work
+# factor (either direction) reports needs_update and is rehashed on login.
 pwd_context = CryptContext(
     schemes=["pbkdf2_sha256"],
     deprecated="auto",
+    pbkdf2_sha256__default_rounds=settings.PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__min_rounds=settings.PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__max_rounds=settings.PASSWORD_HASH_ROUNDS,
 )
 
 def hash_password(password: str) -> str:
@@ -16,6 +30,51 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """(valid, replacement hash if the stored one uses outdated parameters)."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class HashingOverloaded(Exception):
+    """The password hashing queue is full; the caller should back off."""
+
+
+class PasswordHasher:
+    """
+    Runs password hashing on its own small thread pool, so a burst of
+    logins can't take over the threadpool that serves sync requests
+    (hashlib's pbkdf2 releases the GIL, so the workers really run in
+    parallel). At most workers + queue_size jobs are admitted; past that,
+    submit() raises HashingOverloaded instead of queueing without bound.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash")
+        self._capacity = workers + queue_size
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _release(self, _: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+        metrics.auth_hash_in_flight.dec()
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            if self._pending >= self._capacity:
+                metrics.auth_hash_rejected.inc()
+                raise HashingOverloaded()
+            self._pending += 1
+        metrics.auth_hash_in_flight.inc()
+        # Released when the job finishes, not when the request does, so
+        # abandoned requests still count against the limit while they burn CPU.
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_SIZE)
+
 # ----- JWT -----
 ALGORITHM = "HS256"
 
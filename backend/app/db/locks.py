@@ -0,0 +1,40 @@
+import uuid
+
+from sqlalchemy import text
+
+
+def lock_user(db, user_id: uuid.UUID) -> None:
+    # Serialize writers per user for the rest of the transaction. change_seq
+    # values are drawn after taking the lock, so for any one user they become
+    # visible in commit order and a pull cursor can never skip past a row
+    # that commits later with a lower sequence number. Anything else that
+    # writes a user's synced rows or derived state takes the same lock.
+    db.execute(
+        text("SELECT pg_advisory_xact_lock(hashtextextended(:user_id, 0))"),
+        {"user_id": str(user_id)},
+    )
+
+
+def try_lock_user(db, user_id: uuid.UUID) -> bool:
+    """lock_user without waiting: False if another transaction holds it."""
+    return db.execute(
+        text("SELECT pg_try_advisory_xact_lock(hashtextextended(:user_id, 0))"),
+        {"user_id": str(user_id)},
+    ).scalar_one()
+
+
+def bump_change_watermark(db, user_id: uuid.UUID) -> None:
+    """
+    Record that the user's synced rows changed (pull's ETag, user_sync_state).
+    Call right after the transaction's writes, under lock_user, so currval is
+    the highest change_seq it handed out for this user.
+    """
+    db.execute(
+        text("""
+            INSERT INTO user_sync_state AS st (user_id, last_change_seq)
+            VALUES (CAST(:user_id AS uuid), currval('sync_change_seq'))
+            ON CONFLICT (user_id) DO UPDATE SET
+            last_change_seq = greatest(st.last_change_seq, EXCLUDED.last_change_seq)
+        """),
+        {"user_id": str(user_id)},
+    )
@@ -0,0 +1,186 @@
+import abc
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Callable, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.session import run_db
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# WAL positions are handled as plain byte offsets.
+_CURRENT_LSN = text("SELECT CAST(pg_current_wal_lsn() - '0/0' AS bigint)")
+_REPLAY_LSN = text("""
+    SELECT CAST(CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn() ELSE pg_current_wal_lsn() END - '0/0' AS bigint)
+""")
+
+
+def current_wal_lsn(db: Session) -> int:
+    """The primary's WAL position. Read it after a commit: a replica that has replayed this far sees the commit."""
+    return db.execute(_CURRENT_LSN).scalar_one()
+
+
+class LagSource(abc.ABC):
+    """How far the replica has replayed, as a WAL byte offset."""
+
+    @abc.abstractmethod
+    async def replay_lsn(self) -> int:
+        ...
+
+    def note_write(self, lsn: int) -> None:
+        pass
+
+
+class PostgresLagSource(LagSource):
+    """Asks the replica itself (pg_last_wal_replay_lsn)."""
+
+    async def replay_lsn(self) -> int:
+        return await run_db(lambda db: db.execute(_REPLAY_LSN).scalar_one() or 0, replica=True)
+
+
+class StubLagSource(LagSource):
+    """
+    Pretends the replica replays every write exactly lag_seconds after it
+    committed. With DATABASE_REPLICA_URL pointed at the primary, that is
+    enough to exercise routing and fallback against one local Postgres.
+    """
+
+    def __init__(self, lag_seconds: float):
+        self.lag_seconds = lag_seconds
+        self._writes: deque[tuple[float, int]] = deque()
+        self._replayed = 0
+        self._lock = threading.Lock()
+
+    def note_write(self, lsn: int) -> None:
+        with self._lock:
+            self._writes.append((time.monotonic(), lsn))
+
+    async def replay_lsn(self) -> int:
+        horizon = time.monotonic() - self.lag_seconds
+        with self._lock:
+            while self._writes and self._writes[0][0] <= horizon:
+                self._replayed = max(self._replayed, self._writes.popleft()[1])
+            return self._replayed
+
+
+class ReplicaRouter:
+    """
+    Decides per read whether the replica may serve it: only if it has
+    replayed past the WAL position of the user's last write (read your
+    writes), otherwise the primary does.
+
+    Write positions are remembered in this process, from pushes it handled
+    and from change notifications, which carry the position to every worker
+    under the Postgres notifier. An entry is dropped once the replica is past
+    it; max_users bounds the rest (dropping one only risks a stale read).
+    """
+
+    def __init__(self, lag_source: LagSource | None, max_users: int):
+        self.lag_source = lag_source
+        self.max_users = max_users
+        self._pending: OrderedDict[uuid.UUID, int] = OrderedDict()
+        self._replayed = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.lag_source is not None
+
+    def note_write(self, user_id: uuid.UUID, lsn: int) -> None:
+        if not self.enabled:
+            return
+        self.lag_source.note_write(lsn)
+        with self._lock:
+            if lsn <= self._replayed:
+                return
+            self._pending[user_id] = max(lsn, self._pending.get(user_id, 0))
+            self._pending.move_to_end(user_id)
+            while len(self._pending) > self.max_users:
+                self._pending.popitem(last=False)
+
+    def _needs(self, user_id: uuid.UUID) -> int:
+        with self._lock:
+            lsn = self._pending.get(user_id, 0)
+            if lsn and lsn <= self._replayed:
+                del self._pending[user_id]
+                return 0
+            return lsn
+
+    def _caught_up(self, replayed: int) -> None:
+        with self._lock:
+            self._replayed = max(self._replayed, replayed)
+            # Entries are (nearly) in write order, so the replayed ones are at
+            # the front; any straggler goes on its own next lookup.
+            while self._pending:
+                user_id, lsn = next(iter(self._pending.items()))
+                if lsn > self._replayed:
+                    break
+                del self._pending[user_id]
+
+    async def use_replica(self, user_id: uuid.UUID) -> bool:
+        """Whether the user's next read may go to the replica (fallbacks are counted here, hits by run())."""
+        if not self.enabled:
+            return False
+        needed = self._needs(user_id)
+        if needed > self._replayed:
+            # Only users with a recent write pay for a fresh look at the replica.
+            try:
+                self._caught_up(await self.lag_source.replay_lsn())
+            except OperationalError:
+                logger.warning("replica replay position unavailable; reading from the primary", exc_info=True)
+                metrics.db_replica_reads.inc(target="primary", reason="unavailable")
+                return False
+            if needed > self._replayed:
+                metrics.db_replica_reads.inc(target="primary", reason="lagging")
+                return False
+        return True
+
+    async def run(self, fn: Callable[..., T], *args: Any, replica: bool) -> T:
+        """run_db for a read-only fn, on the replica if use_replica() said so; retried on the primary if that fails."""
+        if not replica:
+            return await run_db(fn, *args)
+        try:
+            result = await run_db(fn, *args, replica=True)
+        except OperationalError:
+            logger.warning("replica read failed; retrying on the primary", exc_info=True)
+            metrics.db_replica_reads.inc(target="primary", reason="error")
+            return await run_db(fn, *args)
+        metrics.db_replica_reads.inc(target="replica", reason="caught_up")
+        return result
+
+
+def _collect_ratios() -> None:
+    counts = metrics.db_replica_reads.values()
+    total = sum(counts.values())
+    if total:
+        hits = sum(n for (target, _), n in counts.items() if target == "replica")
+        metrics.db_replica_hit_ratio.set(hits / total)
+        metrics.db_replica_fallback_ratio.set(1 - hits / total)
+
+
+metrics.registry.add_collector(_collect_ratios)
+
+
+def make_replica_router() -> ReplicaRouter:
+    if not settings.DATABASE_REPLICA_URL:
+        return ReplicaRouter(None, settings.REPLICA_MAX_TRACKED_USERS)
+    if settings.REPLICA_LAG_SOURCE == "replica":
+        source: LagSource = PostgresLagSource()
+    elif settings.REPLICA_LAG_SOURCE == "stub":
+        source = StubLagSource(settings.REPLICA_STUB_LAG_SECONDS)
+    else:
+        raise ValueError(f"unknown REPLICA_LAG_SOURCE {settings.REPLICA_LAG_SOURCE!r}")
+    return ReplicaRouter(source, settings.REPLICA_MAX_TRACKED_USERS)
+
+
+replica_router = make_replica_router()
@@ -1,11 +1,46 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 
 from app.api.auth import router as auth_router
-from app.api.sync import router as sync_router
+from app.api.stats import router as stats_router
+from app.api.sync import drain_push_queue, router as sync_router
+from app.api.transfer import router as transfer_router
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+from app.core.metrics import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, registry
+from app.db.session import dispose_engine, init_engine
+from app.services.maintenance import run_maintenance_loop
+from app.services.notifications import change_notifier
+from app.services.push_queue import run_push_queue
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_engine()
+    await change_notifier.start()
+    maintenance = None
+    if settings.MAINTENANCE_INTERVAL_SECONDS > 0:
+        maintenance = asyncio.create_task(run_maintenance_loop(settings.MAINTENANCE_INTERVAL_SECONDS))
+    push_queue = None
+    if settings.SYNC_PUSH_MODE == "queue" and settings.SYNC_QUEUE_WORKERS > 0:
+        push_queue = asyncio.create_task(
+            run_push_queue(drain_push_queue, settings.SYNC_QUEUE_WORKERS, settings.SYNC_QUEUE_POLL_SECONDS)
+        )
+    yield
+    for task in (maintenance, push_queue):
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    await change_notifier.stop()
+    await dispose_engine()
 
-app = FastAPI(title="Offline Fitness Log API", version="0.1.0")
+
+app = FastAPI(title="Offline Fitness Log API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,13 +50,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.GZIP_COMPRESSLEVEL,
+    brotli_quality=settings.BROTLI_QUALITY,
+)
+
+# Outermost, so recorded latency includes compression.
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 app.include_router(auth_router)
 app.include_router(sync_router)
+app.include_router(stats_router)
+app.include_router(transfer_router)
 
 @app.get("/health")
 def health():
     return {"ok": True}
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return Response(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 # ✅ Make Swagger "Authorize" actually send Authorization: Bearer <token>
 def custom_openapi():
     if app.openapi_schema:
@@ -1,3 +1,5 @@
 from app.models.user import User
 from app.models.workout import Workout, WorkoutSet
 from app.models.sync_op import SyncOp
+from app.models.rollup import WorkoutRollup
+from app.models.sync_state import UserSyncState
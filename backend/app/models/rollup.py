@@ -0,0 +1,29 @@
+import uuid
+from datetime import date
+
+from sqlalchemy import BigInteger, Date, ForeignKey, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+from app.models.workout import WorkoutType
+
+
+class WorkoutRollup(Base):
+    """
+    Per-user totals of live (not deleted) workouts per calendar week/month
+    (UTC, weeks start Monday) and workout type. Maintained by push as
+    signed deltas in the same transaction as the workout writes.
+    """
+    __tablename__ = "workout_rollups"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    period: Mapped[str] = mapped_column(String(8), primary_key=True)  # "week" | "month"
+    period_start: Mapped[date] = mapped_column(Date, primary_key=True)
+    type: Mapped[str] = mapped_column(WorkoutType, primary_key=True)
+
+    workout_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    distance_m: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    duration_s: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    rpe_sum: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    rpe_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -1,8 +1,9 @@
 import uuid
 from datetime import datetime
+from typing import Any
 
-from sqlalchemy import DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import BigInteger, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
@@ -11,9 +12,17 @@ from app.db.base import Base
 class SyncOp(Base):
     """
     Idempotency: if client retries same op_id, server can safely ignore.
+
+    With SYNC_PUSH_MODE=queue it is also the write-behind log: push stores
+    the op in payload with applied_at NULL, and a queue worker applies it
+    (in queue_seq order per user), sets applied_at and records the outcome.
     """
     __tablename__ = "sync_ops"
 
     op_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
     user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), index=True, nullable=False)
-    applied_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    applied_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), index=True, nullable=True, default=datetime.utcnow)
+    payload: Mapped[dict[str, Any] | None] = mapped_column(JSONB, nullable=True)
+    queue_seq: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    queued_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    outcome: Mapped[dict[str, Any] | None] = mapped_column(JSONB, nullable=True)
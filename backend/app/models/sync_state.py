@@ -0,0 +1,28 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class UserSyncState(Base):
+    """
+    Per-user sync bookkeeping. purged_seq / purged_at are the highest
+    change_seq / updated_at among rows tombstone compaction has hard-deleted:
+    a client whose cursor is older may still hold one of those rows and has
+    to resync from scratch.
+
+    last_change_seq is the highest change_seq any write has given the user's
+    workouts or sets, bumped in the same transaction as the write. Pull uses
+    it as an ETag; anything writing those tables outside push must bump it
+    too, or clients will be told nothing changed.
+    """
+    __tablename__ = "user_sync_state"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    purged_seq: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    purged_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_change_seq: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
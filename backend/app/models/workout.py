@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text, Numeric, Enum
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, Integer, String, Text, Numeric, Enum, Sequence, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -9,12 +9,22 @@ from app.db.base import Base
 
 WorkoutType = Enum("run", "lift", name="workout_type")
 
+# Shared by every synced table; bumped on each write and used as the pull cursor.
+sync_change_seq = Sequence("sync_change_seq")
+
 
 class Workout(Base):
     __tablename__ = "workouts"
+    __table_args__ = (
+        # Pull is a range scan over one of these; both also serve plain user_id lookups.
+        Index("ix_workouts_user_id_change_seq", "user_id", "change_seq"),
+        Index("ix_workouts_user_id_updated_at", "user_id", "updated_at"),
+        # tombstones only, for compaction
+        Index("ix_workouts_user_id_deleted_at", "user_id", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL")),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)  # client-generated
-    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), index=True, nullable=False)
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
 
     type: Mapped[str] = mapped_column(WorkoutType, nullable=False)
     started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
@@ -29,15 +39,23 @@ class Workout(Base):
     version: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
     deleted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger, sync_change_seq, server_default=sync_change_seq.next_value(), nullable=False
+    )
 
     sets: Mapped[list["WorkoutSet"]] = relationship("WorkoutSet", back_populates="workout")
 
 
 class WorkoutSet(Base):
     __tablename__ = "workout_sets"
+    __table_args__ = (
+        Index("ix_workout_sets_user_id_change_seq", "user_id", "change_seq"),
+        Index("ix_workout_sets_user_id_updated_at", "user_id", "updated_at"),
+        Index("ix_workout_sets_user_id_deleted_at", "user_id", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL")),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)  # client-generated
-    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), index=True, nullable=False)
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     workout_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("workouts.id"), index=True, nullable=False)
 
     position: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -57,5 +75,8 @@ class WorkoutSet(Base):
     version: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
     deleted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger, sync_change_seq, server_default=sync_change_seq.next_value(), nullable=False
+    )
 
     workout: Mapped["Workout"] = relationship("Workout", back_populates="sets")
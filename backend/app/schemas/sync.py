@@ -2,7 +2,17 @@ import uuid
 from typing import Any, Literal
 from pydantic import BaseModel
 
-OpType = Literal["UPSERT_WORKOUT", "DELETE_WORKOUT", "UPSERT_SET", "DELETE_SET"]
+OpType = Literal["UPSERT_WORKOUT", "PATCH_WORKOUT", "DELETE_WORKOUT", "UPSERT_SET", "DELETE_SET"]
+
+# Fields a PATCH_WORKOUT payload may carry, besides the base "version".
+PATCHABLE_WORKOUT_FIELDS = ("type", "started_at", "notes", "distance_m", "duration_s", "rpe")
+
+
+def as_int(v: Any) -> int | None:
+    """A payload number as stored in an integer column (JSON clients may send 5.0)."""
+    if v is None:
+        return None
+    return int(round(v)) if isinstance(v, float) else int(v)
 
 
 class SyncOpIn(BaseModel):
@@ -0,0 +1,217 @@
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+# Epley is only trusted for low-rep sets; higher-rep sets still count towards
+# tonnage but not towards estimated 1RM.
+E1RM_MAX_REPS = 12
+
+_EPOCH = date(1970, 1, 1)
+
+
+@dataclass
+class SetColumns:
+    """A user's live lifting sets, one array per column, in no particular order."""
+
+    names: list[str]  # distinct exercises, normalized (trimmed, lower-cased), sorted
+    exercise: np.ndarray  # int64 index into names
+    reps: np.ndarray  # int64
+    weight_kg: np.ndarray  # float64
+    day: np.ndarray  # int64, days since 1970-01-01 (UTC) of the parent workout
+
+
+def change_watermark(db: Session, user_id: uuid.UUID) -> int:
+    """
+    user_sync_state.last_change_seq: every write to the user's sets or
+    workouts raises it in the same transaction, and unlike max(change_seq)
+    it never falls back when compaction hard-deletes tombstones. Workouts
+    count because their started_at and deletion apply to their sets. One
+    primary-key probe.
+    """
+    seq = db.execute(
+        text("SELECT last_change_seq FROM user_sync_state WHERE user_id = :user_id"),
+        {"user_id": str(user_id)},
+    ).scalar_one_or_none()
+    return seq or 0
+
+
+def load_set_columns(db: Session, user_id: uuid.UUID) -> tuple[int, SetColumns]:
+    """(watermark, columns), read from one snapshot so the two agree."""
+    db.execute(text("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY"))
+    watermark = change_watermark(db, user_id)
+    # array_agg hands back a few flat lists instead of one Row per set, and
+    # exercise names come back already factorized into integer codes.
+    names, exercise, reps, weight_kg, day = db.execute(
+        text("""
+            WITH s AS (
+                SELECT lower(btrim(s.exercise_name)) AS name, s.reps,
+                       CAST(s.weight_kg AS float8) AS weight_kg,
+                       CAST(floor(extract(epoch FROM w.started_at) / 86400) AS integer) AS day
+                FROM workout_sets AS s
+                JOIN workouts AS w ON w.id = s.workout_id
+                WHERE s.user_id = :user_id
+                  AND s.deleted_at IS NULL AND w.deleted_at IS NULL
+                  AND s.reps > 0 AND s.weight_kg > 0 AND btrim(s.exercise_name) <> ''
+            ),
+            n AS (
+                SELECT name, CAST(row_number() OVER (ORDER BY name) - 1 AS integer) AS code
+                FROM (SELECT DISTINCT name FROM s) AS d
+            )
+            SELECT
+                (SELECT array_agg(name ORDER BY code) FROM n),
+                array_agg(n.code), array_agg(s.reps), array_agg(s.weight_kg), array_agg(s.day)
+            FROM s JOIN n USING (name)
+        """),
+        {"user_id": str(user_id)},
+    ).one()
+    db.commit()
+    return watermark, SetColumns(
+        names=names or [],
+        exercise=np.array(exercise or [], dtype=np.int64),
+        reps=np.array(reps or [], dtype=np.int64),
+        weight_kg=np.array(weight_kg or [], dtype=np.float64),
+        day=np.array(day or [], dtype=np.int64),
+    )
+
+
+def _argmax_by_group(group: np.ndarray, values: np.ndarray, day: np.ndarray, n_groups: int) -> dict[int, int]:
+    """
+    group -> index of its largest value, earliest day on ties. NaN never
+    wins; groups whose values are all NaN are left out.
+    """
+    best = np.full(n_groups, -np.inf)
+    np.fmax.at(best, group, values)
+    # Only the (few) rows equal to their group's max need the tie-break sort.
+    cand = np.flatnonzero(values == best[group])
+    cand = cand[np.lexsort((day[cand], group[cand]))]
+    g = group[cand]
+    firsts = np.flatnonzero(np.diff(g, prepend=-1))
+    return dict(zip(g[firsts].tolist(), cand[firsts].tolist()))
+
+
+def _day(d: int) -> str:
+    return (_EPOCH + timedelta(days=int(d))).isoformat()
+
+
+def compute_lift_analytics(cols: SetColumns) -> list[dict[str, Any]]:
+    """
+    Per exercise: set count, PRs (heaviest set, best estimated 1RM, biggest
+    single-set volume, each with the date first achieved) and a weekly
+    series of tonnage and best e1RM. Weeks start on Monday (UTC).
+
+    Everything is grouped with sorts and bincounts over the whole column set
+    at once; there is no per-set Python loop.
+    """
+    if cols.reps.size == 0:
+        return []
+
+    names = cols.names
+    ex = cols.exercise
+    reps = cols.reps
+    kg = cols.weight_kg
+    volume = kg * reps
+    # A single is its own 1RM; Epley would overstate it by 1/30.
+    e1rm = np.where(reps == 1, kg, kg * (1 + reps / 30.0))
+    e1rm = np.where(reps <= E1RM_MAX_REPS, e1rm, np.nan)
+
+    set_counts = np.bincount(ex, minlength=len(names))
+    prs = {
+        name: _argmax_by_group(ex, values, cols.day, len(names))
+        for name, values in (("max_weight", kg), ("best_e1rm", e1rm), ("best_set_volume", volume))
+    }
+
+    # weekly buckets keyed by (exercise, week) packed into one integer
+    week = (cols.day + 3) // 7  # 1970-01-01 was a Thursday
+    first_week = int(week.min())
+    span = int(week.max()) - first_week + 1
+    packed = ex * span + (week - first_week)
+    if len(names) * span <= max(4 * len(packed), 1 << 16):
+        # dense: one slot per (exercise, week), empty ones dropped after
+        counts = np.bincount(packed, minlength=len(names) * span)
+        keys = np.flatnonzero(counts)
+        slot = np.zeros(len(counts), dtype=np.int64)
+        slot[keys] = np.arange(len(keys))
+        inv = slot[packed]
+    else:
+        keys, inv = np.unique(packed, return_inverse=True)
+        inv = inv.ravel()
+    tonnage = np.bincount(inv, weights=volume, minlength=len(keys))
+    best_e1rm = np.full(len(keys), -np.inf)
+    np.fmax.at(best_e1rm, inv, e1rm)
+    key_ex = keys // span
+    key_week_start = (keys % span + first_week) * 7 - 3
+    bounds = np.searchsorted(key_ex, np.arange(len(names) + 1))
+
+    def record(metric: str, i: int) -> dict[str, Any] | None:
+        idx = prs[metric].get(i)
+        if idx is None or (metric == "best_e1rm" and np.isnan(e1rm[idx])):
+            return None
+        return {
+            "weight_kg": round(float(kg[idx]), 2),
+            "reps": int(reps[idx]),
+            "e1rm_kg": None if np.isnan(e1rm[idx]) else round(float(e1rm[idx]), 2),
+            "volume_kg": round(float(volume[idx]), 2),
+            "date": _day(cols.day[idx]),
+        }
+
+    out = []
+    for i, name in enumerate(names):
+        lo, hi = bounds[i], bounds[i + 1]
+        out.append(
+            {
+                "exercise": str(name),
+                "sets": int(set_counts[i]),
+                "prs": {metric: record(metric, i) for metric in prs},
+                "weekly": {
+                    "week_start": [_day(d) for d in key_week_start[lo:hi]],
+                    "volume_kg": np.round(tonnage[lo:hi], 2).tolist(),
+                    "best_e1rm_kg": [None if v == -np.inf else round(float(v), 2) for v in best_e1rm[lo:hi]],
+                },
+            }
+        )
+    return out
+
+
+class AnalyticsCache:
+    """
+    user id -> (change watermark, computed analytics). An entry is only
+    served while the user's watermark is unchanged, so any set or workout
+    write invalidates it without explicit hooks. Least recently used users
+    are evicted past max_entries.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[uuid.UUID, tuple[int, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: uuid.UUID, watermark: int) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] != watermark:
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def put(self, user_id: uuid.UUID, watermark: int, value: Any) -> None:
+        with self._lock:
+            self._entries[user_id] = (watermark, value)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+analytics_cache = AnalyticsCache(settings.ANALYTICS_CACHE_MAX_USERS)
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.locks import lock_user
+from app.db.session import run_db
+
+logger = logging.getLogger(__name__)
+
+
+def prune_sync_ops(db: Session, retention_days: int | None = None, batch_size: int | None = None) -> int:
+    """
+    Forget applied op_ids older than the retention window.
+
+    Deletes in small batches (each committed on its own) so the sweep never
+    holds locks on sync_ops for long while clients are pushing.
+    """
+    retention_days = settings.SYNC_OP_RETENTION_DAYS if retention_days is None else retention_days
+    batch_size = batch_size or settings.MAINTENANCE_BATCH_SIZE
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+
+    total = 0
+    while True:
+        deleted = db.execute(
+            text("""
+                DELETE FROM sync_ops
+                WHERE op_id IN (
+                    SELECT op_id FROM sync_ops
+                    WHERE applied_at < :cutoff
+                    LIMIT :batch_size
+                    FOR UPDATE SKIP LOCKED
+                )
+            """),
+            {"cutoff": cutoff, "batch_size": batch_size},
+        ).rowcount
+        db.commit()
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+# Upserts the purge high-water marks from whatever the delete CTE returned.
+_RECORD_PURGED = """
+    purged AS (
+        INSERT INTO user_sync_state AS st (user_id, purged_seq, purged_at)
+        SELECT CAST(:user_id AS uuid), max(change_seq), max(updated_at) FROM gone
+        HAVING count(*) > 0
+        ON CONFLICT (user_id) DO UPDATE SET
+        purged_seq = greatest(st.purged_seq, EXCLUDED.purged_seq),
+        purged_at = greatest(st.purged_at, EXCLUDED.purged_at)
+    )
+    SELECT count(*) FROM gone
+"""
+
+# Set tombstones, plus every set of a workout tombstone that is itself due
+# (those have to go first for the foreign key).
+_PURGE_SETS = text(f"""
+    WITH doomed AS (
+        (SELECT id FROM workout_sets WHERE user_id = :user_id AND deleted_at < :cutoff)
+        UNION ALL
+        (SELECT s.id FROM workouts AS w JOIN workout_sets AS s ON s.workout_id = w.id
+         WHERE w.user_id = :user_id AND w.deleted_at < :cutoff
+           AND (s.deleted_at IS NULL OR s.deleted_at >= :cutoff))
+        LIMIT :batch_size
+    ),
+    gone AS (
+        DELETE FROM workout_sets WHERE id IN (SELECT id FROM doomed)
+        RETURNING change_seq, updated_at
+    ),
+    {_RECORD_PURGED}
+""")
+
+_PURGE_WORKOUTS = text(f"""
+    WITH doomed AS (
+        SELECT w.id FROM workouts AS w
+        WHERE w.user_id = :user_id AND w.deleted_at < :cutoff
+          AND NOT EXISTS (SELECT 1 FROM workout_sets AS s WHERE s.workout_id = w.id)
+        LIMIT :batch_size
+    ),
+    gone AS (
+        DELETE FROM workouts WHERE id IN (SELECT id FROM doomed)
+        RETURNING change_seq, updated_at
+    ),
+    {_RECORD_PURGED}
+""")
+
+
+def _purge_user(db: Session, user_id: uuid.UUID, cutoff: datetime, batch_size: int) -> dict[str, int]:
+    purged = {"workout_sets": 0, "workouts": 0}
+    for table, stmt in (("workout_sets", _PURGE_SETS), ("workouts", _PURGE_WORKOUTS)):
+        while True:
+            # One short transaction per batch, under the same per-user lock
+            # push takes, so a tombstone can't be revived mid-purge.
+            lock_user(db, user_id)
+            n = db.execute(
+                stmt, {"user_id": str(user_id), "cutoff": cutoff, "batch_size": batch_size}
+            ).scalar_one()
+            db.commit()
+            purged[table] += n
+            if n < batch_size:
+                break
+    return purged
+
+
+def compact_tombstones(db: Session, horizon_days: int | None = None, batch_size: int | None = None) -> dict[str, int]:
+    """
+    Hard-delete workouts and sets soft-deleted longer ago than the horizon.
+
+    Works user by user in batches, each its own transaction, and records
+    the highest purged change_seq/updated_at in user_sync_state so pull can
+    send clients with older cursors to a full resync.
+    """
+    horizon_days = settings.SYNC_TOMBSTONE_HORIZON_DAYS if horizon_days is None else horizon_days
+    batch_size = batch_size or settings.MAINTENANCE_BATCH_SIZE
+    cutoff = datetime.now(timezone.utc) - timedelta(days=horizon_days)
+
+    user_ids = [
+        r[0]
+        for r in db.execute(
+            text("""
+                SELECT user_id FROM workouts WHERE deleted_at < :cutoff
+                UNION
+                SELECT user_id FROM workout_sets WHERE deleted_at < :cutoff
+            """),
+            {"cutoff": cutoff},
+        ).fetchall()
+    ]
+    db.commit()
+
+    total = {"users": len(user_ids), "workout_sets": 0, "workouts": 0}
+    for user_id in user_ids:
+        for table, n in _purge_user(db, user_id, cutoff, batch_size).items():
+            total[table] += n
+    return total
+
+
+async def run_maintenance_loop(interval_seconds: float) -> None:
+    """
+    Periodic tombstone compaction and sync_ops pruning, for the app lifespan.
+    Safe to run in every worker at once: both jobs work in small batches
+    that skip or wait on rows another worker holds.
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            compacted = await run_db(compact_tombstones)
+            pruned = await run_db(prune_sync_ops)
+            logger.info("maintenance: compacted %s, pruned %d sync_ops", compacted, pruned)
+        except Exception:
+            logger.exception("maintenance run failed")
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager, suppress
+from typing import Iterator
+
+import psycopg
+from sqlalchemy.engine import make_url
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.replica import replica_router
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "sync_changes"
+
+
+class Subscription:
+    """One connected device waiting to hear that its user's data changed."""
+
+    def __init__(self) -> None:
+        self._event = asyncio.Event()
+
+    def wake(self) -> None:
+        self._event.set()
+
+    async def wait(self, timeout: float | None = None) -> bool:
+        """True if woken (wakes since the last wait collapse into one), False on timeout."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except TimeoutError:
+            return False
+        self._event.clear()
+        return True
+
+
+class ChangeNotifier:
+    """
+    Wakes a user's subscribed devices after push commits changes for them.
+
+    This base class only reaches subscribers in the same process, which is
+    all a single worker (or a test) needs. Everything runs on the event
+    loop; there is no locking.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: dict[uuid.UUID, set[Subscription]] = defaultdict(set)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    @contextmanager
+    def subscribe(self, user_id: uuid.UUID) -> Iterator[Subscription]:
+        sub = Subscription()
+        self._subscribers[user_id].add(sub)
+        metrics.sync_subscribers.inc()
+        try:
+            yield sub
+        finally:
+            metrics.sync_subscribers.dec()
+            subs = self._subscribers.get(user_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[user_id]
+
+    def _dispatch(self, user_id: uuid.UUID) -> None:
+        for sub in self._subscribers.get(user_id, ()):
+            sub.wake()
+
+    def _wake_all(self) -> None:
+        for subs in self._subscribers.values():
+            for sub in subs:
+                sub.wake()
+
+    async def publish(self, user_id: uuid.UUID, lsn: int | None = None) -> None:
+        """
+        Call after the transaction that changed the user's data has committed,
+        with its WAL position if a read replica is in use (see replica_router).
+        """
+        metrics.sync_notifications.inc()
+        self._dispatch(user_id)
+
+
+class PostgresChangeNotifier(ChangeNotifier):
+    """
+    Fans out through LISTEN/NOTIFY so devices connected to any worker or
+    host hear about a push handled by any other. Each process holds two
+    connections outside the pool: one LISTENing, one for NOTIFY.
+
+    Notifications sent while the listener is reconnecting are lost, so
+    after every (re)connect all local subscribers are woken to re-check.
+    """
+
+    def __init__(self, database_url: str) -> None:
+        super().__init__()
+        # libpq doesn't know SQLAlchemy's "+psycopg" driver suffix
+        self._conninfo = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self._listener: asyncio.Task | None = None
+        self._publisher: psycopg.AsyncConnection | None = None
+        self._publish_lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+        if self._publisher is not None:
+            await self._publisher.close()
+            self._publisher = None
+
+    async def _listen(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self._conninfo, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {CHANNEL}")
+                    backoff = 1.0
+                    self._wake_all()
+                    async for notify in conn.notifies():
+                        try:
+                            user, _, lsn = notify.payload.partition(":")
+                            user_id = uuid.UUID(user)
+                            if lsn:
+                                # so this worker's pulls read the write too
+                                replica_router.note_write(user_id, int(lsn))
+                            self._dispatch(user_id)
+                        except ValueError:
+                            logger.warning("ignoring malformed %s payload %r", CHANNEL, notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("change listener lost its connection; retrying in %.0fs", backoff)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    async def publish(self, user_id: uuid.UUID, lsn: int | None = None) -> None:
+        metrics.sync_notifications.inc()
+        payload = str(user_id) if lsn is None else f"{user_id}:{lsn}"
+        # NOTIFY from our own short autocommit transaction rather than inside
+        # push's: it takes a cluster-wide lock at commit, which push
+        # shouldn't hold while its row locks are still held.
+        try:
+            async with self._publish_lock:
+                if self._publisher is None or self._publisher.closed:
+                    self._publisher = await psycopg.AsyncConnection.connect(self._conninfo, autocommit=True)
+                await self._publisher.execute("SELECT pg_notify(%s, %s)", (CHANNEL, payload))
+        except Exception:
+            # The push itself has committed; the worst case is other devices
+            # finding out on their next poll. Local ones can still hear now.
+            logger.exception("NOTIFY for user %s failed", user_id)
+            self._dispatch(user_id)
+
+
+def make_notifier(backend: str) -> ChangeNotifier:
+    if backend == "postgres":
+        return PostgresChangeNotifier(settings.DATABASE_URL)
+    if backend == "memory":
+        return ChangeNotifier()
+    raise ValueError(f"unknown SYNC_NOTIFY_BACKEND {backend!r}")
+
+
+change_notifier = make_notifier(settings.SYNC_NOTIFY_BACKEND)
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import logging
+import random
+import uuid
+from contextlib import suppress
+from datetime import datetime
+from typing import Any, Callable
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.replica import replica_router
+from app.db.session import run_db
+from app.services.notifications import change_notifier
+
+logger = logging.getLogger(__name__)
+
+# (ops applied, changed, WAL position) or None if the user was busy; see
+# app.api.sync.drain_push_queue.
+Drain = Callable[[Session, uuid.UUID], "tuple[int, bool, int | None] | None"]
+
+_work_available = asyncio.Event()
+
+
+def enqueue_ops(db: Session, user_id: uuid.UUID, ops: list[dict[str, Any]], now: datetime) -> set[str]:
+    """
+    Append ops (SyncOp dumps) to the user's queue in the order given. An
+    op_id already queued or applied is left as it is, so a retried push
+    queues nothing twice; one that failed goes back on the end of the queue,
+    the same retry sync mode gives it. Returns the op_ids another user
+    already has, which are not queued. Does not commit.
+    """
+    unique: dict[str, dict[str, Any]] = {}
+    for op in ops:
+        unique.setdefault(str(op["op_id"]), op)
+    if not unique:
+        return set()
+    db.execute(
+        text("""
+            INSERT INTO sync_ops AS s (op_id, user_id, payload, queue_seq, queued_at)
+            SELECT o.op_id, CAST(:user_id AS uuid), o.payload, nextval('sync_op_queue_seq'), CAST(:now AS timestamptz)
+            FROM unnest(CAST(:op_ids AS uuid[]), CAST(:payloads AS jsonb[])) WITH ORDINALITY AS o(op_id, payload, ord)
+            ORDER BY o.ord
+            ON CONFLICT (op_id) DO UPDATE SET
+            payload = EXCLUDED.payload,
+            queue_seq = EXCLUDED.queue_seq,
+            queued_at = EXCLUDED.queued_at,
+            applied_at = NULL,
+            outcome = NULL
+            WHERE s.user_id = EXCLUDED.user_id AND s.outcome->>'status' = 'failed'
+        """),
+        {
+            "user_id": str(user_id),
+            "now": now.isoformat(),
+            "op_ids": list(unique),
+            "payloads": [json.dumps(op) for op in unique.values()],
+        },
+    )
+    rows = db.execute(
+        text("SELECT op_id FROM sync_ops WHERE op_id = ANY(CAST(:op_ids AS uuid[])) AND user_id <> :user_id"),
+        {"user_id": str(user_id), "op_ids": list(unique)},
+    ).fetchall()
+    return {str(r[0]) for r in rows}
+
+
+def queued_users(db: Session, limit: int) -> list[uuid.UUID]:
+    """Users with queued ops, those waiting longest first."""
+    rows = db.execute(
+        text("""
+            SELECT user_id FROM sync_ops WHERE applied_at IS NULL
+            GROUP BY user_id ORDER BY min(queue_seq) LIMIT :limit
+        """),
+        {"limit": limit},
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def next_queued_ops(db: Session, user_id: uuid.UUID, limit: int) -> list[dict[str, Any]]:
+    rows = db.execute(
+        text("""
+            SELECT payload FROM sync_ops
+            WHERE user_id = :user_id AND applied_at IS NULL
+            ORDER BY queue_seq LIMIT :limit
+        """),
+        {"user_id": str(user_id), "limit": limit},
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def record_outcomes(db: Session, outcomes: dict[str, dict[str, Any]], now: datetime) -> None:
+    """Mark queued ops applied with their outcome; the payload isn't needed any more. Does not commit."""
+    if not outcomes:
+        return
+    rows = db.execute(
+        text("""
+            UPDATE sync_ops AS s SET
+            applied_at = CAST(:now AS timestamptz),
+            outcome = v.outcome,
+            payload = NULL
+            FROM unnest(CAST(:op_ids AS uuid[]), CAST(:outcomes AS jsonb[])) AS v(op_id, outcome)
+            WHERE s.op_id = v.op_id
+            RETURNING s.queued_at
+        """),
+        {"now": now.isoformat(), "op_ids": list(outcomes), "outcomes": [json.dumps(o) for o in outcomes.values()]},
+    ).fetchall()
+    for (queued_at,) in rows:
+        if queued_at is not None:
+            metrics.sync_queue_lag.observe((now - queued_at).total_seconds())
+
+
+def op_statuses(db: Session, user_id: uuid.UUID, op_ids: list[str]) -> tuple[list[dict[str, Any]], int]:
+    """Each op's status (see /sync/ops) in the order asked, plus how many of the user's ops are still queued."""
+    rows = db.execute(
+        text("""
+            SELECT op_id, applied_at, outcome FROM sync_ops
+            WHERE user_id = :user_id AND op_id = ANY(CAST(:op_ids AS uuid[]))
+        """),
+        {"user_id": str(user_id), "op_ids": op_ids},
+    ).fetchall()
+    known = {str(r.op_id): r for r in rows}
+    ops = []
+    for op_id in op_ids:
+        r = known.get(op_id)
+        if r is None:
+            ops.append({"op_id": op_id, "status": "unknown"})
+        elif r.applied_at is None:
+            ops.append({"op_id": op_id, "status": "queued"})
+        else:
+            # ops pushed in sync mode have no outcome; they were applied then
+            ops.append({"op_id": op_id, **(r.outcome or {"status": "applied"})})
+    queued = db.execute(
+        text("SELECT count(*) FROM sync_ops WHERE user_id = :user_id AND applied_at IS NULL"),
+        {"user_id": str(user_id)},
+    ).scalar_one()
+    return ops, queued
+
+
+def wake_push_queue() -> None:
+    """Tell this process's idle workers there is work, instead of waiting out their poll interval."""
+    _work_available.set()
+
+
+async def _drain_some(drain: Drain) -> bool:
+    users = await run_db(queued_users, settings.SYNC_QUEUE_SCAN_USERS)
+    # Workers scanning in different orders spread out instead of all
+    # contending for the oldest user.
+    random.shuffle(users)
+    worked = False
+    for user_id in users:
+        done = await run_db(drain, user_id)
+        if done is None:
+            continue
+        applied, changed, lsn = done
+        worked = worked or applied > 0
+        if lsn is not None:
+            replica_router.note_write(user_id, lsn)
+        if changed:
+            await change_notifier.publish(user_id, lsn)
+    return worked
+
+
+async def _worker(drain: Drain, poll_seconds: float) -> None:
+    while True:
+        try:
+            if await _drain_some(drain):
+                continue
+        except Exception:
+            logger.exception("push queue worker failed; retrying")
+        with suppress(TimeoutError):
+            await asyncio.wait_for(_work_available.wait(), poll_seconds)
+        _work_available.clear()
+
+
+async def run_push_queue(drain: Drain, workers: int, poll_seconds: float) -> None:
+    """
+    Apply queued pushes until cancelled, with `workers` concurrent loops.
+    Any number of processes can run this against the same database: a
+    user's ops are only ever applied by whoever holds that user's lock,
+    oldest first, so they stay in order whichever worker picks them up.
+    """
+    await asyncio.gather(*(_worker(drain, poll_seconds) for _ in range(workers)))
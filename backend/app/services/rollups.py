@@ -0,0 +1,163 @@
+import uuid
+from typing import Any, Iterable
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.db.locks import lock_user
+from app.schemas.sync import as_int
+
+PERIODS = ("week", "month")
+
+# Periods are bucketed in UTC; weeks start on Monday (date_trunc('week')).
+_PERIODS_SQL = "(VALUES ('week'), ('month')) AS p(period)"
+
+
+def _rollup_key(w: dict[str, Any]) -> tuple[Any, ...]:
+    return (w["type"], str(w["started_at"]), w["distance_m"], w["duration_s"], w["rpe"])
+
+
+def apply_workout_deltas(
+    db: Session,
+    user_id: uuid.UUID,
+    changes: Iterable[tuple[dict[str, Any] | None, dict[str, Any] | None]],
+) -> None:
+    """
+    Fold (before, after) workout states into the user's rollups.
+
+    Either side may be None (insert / unknown row). A row counts only while
+    deleted_at is null, so a soft delete reverses its contribution and an
+    edit moves it between buckets when type or started_at change. Must run
+    inside the transaction that writes the workouts, after lock_user.
+    """
+    signed: list[tuple[int, dict[str, Any]]] = []
+    for before, after in changes:
+        live_before = before is not None and before["deleted_at"] is None
+        live_after = after is not None and after["deleted_at"] is None
+        if live_before and live_after and _rollup_key(before) == _rollup_key(after):
+            continue
+        if live_before:
+            signed.append((-1, before))
+        if live_after:
+            signed.append((1, after))
+    if not signed:
+        return
+
+    db.execute(
+        text(f"""
+            INSERT INTO workout_rollups AS r
+            (user_id, period, period_start, type, workout_count, distance_m, duration_s, rpe_sum, rpe_count)
+            SELECT CAST(:user_id AS uuid), p.period,
+                   CAST(date_trunc(p.period, v.started_at AT TIME ZONE 'UTC') AS date), v.type,
+                   sum(v.sign),
+                   sum(v.sign * coalesce(v.distance_m, 0)),
+                   sum(v.sign * coalesce(v.duration_s, 0)),
+                   sum(v.sign * coalesce(v.rpe, 0)),
+                   sum(CASE WHEN v.rpe IS NULL THEN 0 ELSE v.sign END)
+            FROM unnest(
+                CAST(:signs AS integer[]),
+                CAST(:types AS workout_type[]),
+                CAST(:started_at AS timestamptz[]),
+                CAST(:distance_m AS integer[]),
+                CAST(:duration_s AS integer[]),
+                CAST(:rpe AS integer[])
+            ) AS v(sign, type, started_at, distance_m, duration_s, rpe)
+            CROSS JOIN {_PERIODS_SQL}
+            GROUP BY 1, 2, 3, 4
+            ON CONFLICT (user_id, period, period_start, type) DO UPDATE SET
+            workout_count = r.workout_count + EXCLUDED.workout_count,
+            distance_m = r.distance_m + EXCLUDED.distance_m,
+            duration_s = r.duration_s + EXCLUDED.duration_s,
+            rpe_sum = r.rpe_sum + EXCLUDED.rpe_sum,
+            rpe_count = r.rpe_count + EXCLUDED.rpe_count
+        """),
+        {
+            "user_id": str(user_id),
+            "signs": [s for s, _ in signed],
+            "types": [w["type"] for _, w in signed],
+            "started_at": [str(w["started_at"]) for _, w in signed],
+            "distance_m": [as_int(w["distance_m"]) for _, w in signed],
+            "duration_s": [as_int(w["duration_s"]) for _, w in signed],
+            "rpe": [as_int(w["rpe"]) for _, w in signed],
+        },
+    )
+
+
+def rebuild_user_rollups(db: Session, user_id: uuid.UUID) -> int:
+    """Recompute one user's rollups from workouts. Returns the number of rollup rows."""
+    lock_user(db, user_id)
+    n = replace_user_rollups(db, user_id)
+    db.commit()
+    return n
+
+
+def replace_user_rollups(db: Session, user_id: uuid.UUID) -> int:
+    """rebuild_user_rollups inside the caller's transaction, which must hold lock_user."""
+    db.execute(text("DELETE FROM workout_rollups WHERE user_id = :user_id"), {"user_id": str(user_id)})
+    return db.execute(
+        text(f"""
+            INSERT INTO workout_rollups
+            (user_id, period, period_start, type, workout_count, distance_m, duration_s, rpe_sum, rpe_count)
+            SELECT w.user_id, p.period,
+                   CAST(date_trunc(p.period, w.started_at AT TIME ZONE 'UTC') AS date), w.type,
+                   count(*), coalesce(sum(w.distance_m), 0), coalesce(sum(w.duration_s), 0),
+                   coalesce(sum(w.rpe), 0), count(w.rpe)
+            FROM workouts AS w
+            CROSS JOIN {_PERIODS_SQL}
+            WHERE w.user_id = :user_id AND w.deleted_at IS NULL
+            GROUP BY 1, 2, 3, 4
+        """),
+        {"user_id": str(user_id)},
+    ).rowcount
+
+
+def backfill_rollups(db: Session, user_id: uuid.UUID | None = None) -> tuple[int, int]:
+    """
+    Rebuild rollups for one user or all of them, one transaction per user so
+    pushes are only ever blocked on the user being rebuilt.
+    Returns (users, rollup rows).
+    """
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        user_ids = [r[0] for r in db.execute(text("SELECT id FROM users ORDER BY id")).fetchall()]
+        db.commit()
+
+    rows = 0
+    for uid in user_ids:
+        rows += rebuild_user_rollups(db, uid)
+    return len(user_ids), rows
+
+
+def read_rollups(
+    db: Session,
+    user_id: uuid.UUID,
+    period: str,
+    start: Any = None,
+    end: Any = None,
+    workout_type: str | None = None,
+) -> list[dict[str, Any]]:
+    rows = db.execute(
+        text("""
+            SELECT period_start, type, workout_count, distance_m, duration_s, rpe_sum, rpe_count
+            FROM workout_rollups
+            WHERE user_id = :user_id AND period = :period
+              AND (CAST(:start AS date) IS NULL OR period_start >= CAST(:start AS date))
+              AND (CAST(:end AS date) IS NULL OR period_start < CAST(:end AS date))
+              AND (CAST(:type AS workout_type) IS NULL OR type = CAST(:type AS workout_type))
+              AND workout_count > 0
+            ORDER BY period_start, type
+        """),
+        {"user_id": str(user_id), "period": period, "start": start, "end": end, "type": workout_type},
+    ).fetchall()
+    return [
+        {
+            "period_start": r[0].isoformat(),
+            "type": r[1],
+            "workout_count": r[2],
+            "distance_m": r[3],
+            "duration_s": r[4],
+            "avg_rpe": round(r[5] / r[6], 2) if r[6] else None,
+        }
+        for r in rows
+    ]
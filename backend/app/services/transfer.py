@@ -0,0 +1,199 @@
+import csv
+import uuid
+from typing import Any, Literal
+
+from psycopg import sql
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.db.locks import bump_change_watermark, lock_user
+from app.services.rollups import replace_user_rollups
+
+TransferFormat = Literal["csv", "ndjson"]
+TransferTable = Literal["workouts", "sets"]
+
+# What export writes and import accepts, per table. Import ignores
+# updated_at (the server stamps it) but takes it so exports round-trip.
+COLUMNS: dict[str, tuple[str, ...]] = {
+    "workouts": ("id", "type", "started_at", "notes", "distance_m", "duration_s", "rpe", "version", "updated_at"),
+    "sets": (
+        "id", "workout_id", "position", "exercise_name", "reps", "weight_kg", "distance_m", "duration_s", "notes",
+        "version", "updated_at",
+    ),
+}
+_DB_TABLE = {"workouts": "workouts", "sets": "workout_sets"}
+# NDJSON "kind", the same as pull's stream uses
+KINDS = {"workouts": "workout", "sets": "workout_set"}
+
+# COPY's CSV format with quote and delimiter bytes that can't occur in
+# JSON text (raw control characters must be escaped there), so every line
+# passes through verbatim -- the text format would double its backslashes.
+_JSON_LINES = "(FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')"
+
+
+class InvalidImport(ValueError):
+    """The uploaded file can't be imported; the message is safe to show the client."""
+
+
+def export_copy(table: TransferTable, fmt: TransferFormat, user_id: uuid.UUID) -> sql.Composed:
+    """COPY ... TO STDOUT for the user's live rows of one table, oldest change first."""
+    select = sql.SQL("SELECT {cols} FROM {table} WHERE user_id = {user_id} AND deleted_at IS NULL ORDER BY change_seq").format(
+        cols=sql.SQL(", ").join(map(sql.Identifier, COLUMNS[table])),
+        table=sql.Identifier(_DB_TABLE[table]),
+        user_id=sql.Literal(str(user_id)),
+    )
+    if fmt == "csv":
+        return sql.SQL("COPY ({select}) TO STDOUT (FORMAT csv, HEADER)").format(select=select)
+    return sql.SQL("COPY (SELECT json_build_object('kind', {kind}, 'data', to_json(t)) FROM ({select}) AS t) TO STDOUT " + _JSON_LINES).format(
+        kind=sql.Literal(KINDS[table]), select=select
+    )
+
+
+def create_staging(db: Session) -> None:
+    """Per-transaction staging tables shaped like the real ones, minus constraints."""
+    for table in COLUMNS:
+        db.execute(
+            text(
+                f"CREATE TEMP TABLE import_{table} ON COMMIT DROP AS "
+                f"SELECT {', '.join(COLUMNS[table])} FROM {_DB_TABLE[table]} WITH NO DATA"
+            )
+        )
+    db.execute(text("CREATE TEMP TABLE import_docs (doc jsonb) ON COMMIT DROP"))
+
+
+def csv_columns(header: bytes, table: TransferTable) -> tuple[str, ...]:
+    try:
+        cols = tuple(c.strip() for c in next(csv.reader([header.decode("utf-8-sig")])))
+    except (UnicodeDecodeError, StopIteration):
+        raise InvalidImport("CSV must start with a header row")
+    unknown = [c for c in cols if c not in COLUMNS[table]]
+    if unknown:
+        raise InvalidImport(f"unknown {table} columns: {', '.join(unknown)}")
+    return cols
+
+
+def import_copy(fmt: TransferFormat, table: TransferTable, columns: tuple[str, ...] = ()) -> sql.Composed:
+    """COPY ... FROM STDIN into the staging table for one upload."""
+    if fmt == "csv":
+        return sql.SQL("COPY {table} ({cols}) FROM STDIN (FORMAT csv, HEADER)").format(
+            table=sql.Identifier(f"import_{table}"), cols=sql.SQL(", ").join(map(sql.Identifier, columns))
+        )
+    return sql.SQL("COPY import_docs FROM STDIN " + _JSON_LINES)
+
+
+def _unpack_docs(db: Session, default_table: TransferTable) -> None:
+    # NDJSON lines are either export's {"kind", "data"} envelopes or bare
+    # rows of the table the request named.
+    for table, kind in KINDS.items():
+        db.execute(
+            text(f"""
+                INSERT INTO import_{table}
+                SELECT r.* FROM import_docs AS d,
+                LATERAL jsonb_populate_record(NULL::import_{table}, coalesce(d.doc -> 'data', d.doc)) AS r
+                WHERE d.doc IS NOT NULL AND coalesce(d.doc ->> 'kind', :default_kind) = :kind
+            """),
+            {"kind": kind, "default_kind": KINDS[default_table]},
+        )
+
+
+# Version-aware upsert: a staged row replaces the stored one only if its
+# version is higher (so re-importing an export is a no-op), never touches
+# another user's id, and revives a tombstone it supersedes. Within the
+# file, the highest version of each id wins.
+_MERGE_WORKOUTS = text("""
+    WITH src AS (
+        SELECT DISTINCT ON (id) * FROM (
+            SELECT coalesce(id, gen_random_uuid()) AS id, type, started_at, notes, distance_m, duration_s, rpe,
+                   greatest(coalesce(version, 1), 1) AS version
+            FROM import_workouts
+        ) AS s
+        ORDER BY id, version DESC
+    ),
+    merged AS (
+        INSERT INTO workouts AS w
+        (id, user_id, type, started_at, notes, distance_m, duration_s, rpe, version, updated_at)
+        SELECT id, CAST(:user_id AS uuid), type, started_at, notes, distance_m, duration_s, rpe, version, now()
+        FROM src
+        ON CONFLICT (id) DO UPDATE SET
+        type = EXCLUDED.type,
+        started_at = EXCLUDED.started_at,
+        notes = EXCLUDED.notes,
+        distance_m = EXCLUDED.distance_m,
+        duration_s = EXCLUDED.duration_s,
+        rpe = EXCLUDED.rpe,
+        version = EXCLUDED.version,
+        updated_at = EXCLUDED.updated_at,
+        deleted_at = NULL,
+        change_seq = nextval('sync_change_seq')
+        WHERE w.user_id = EXCLUDED.user_id AND EXCLUDED.version > w.version
+        RETURNING xmax = 0 AS inserted
+    )
+    SELECT (SELECT count(*) FROM src), count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted)
+    FROM merged
+""")
+
+# Runs after the workouts merge; sets whose parent isn't one of the user's
+# live workouts are skipped, as push rejects them.
+_MERGE_SETS = text("""
+    WITH src AS (
+        SELECT DISTINCT ON (id) * FROM (
+            SELECT coalesce(id, gen_random_uuid()) AS id, workout_id, coalesce(position, 0) AS position,
+                   exercise_name, reps, weight_kg, distance_m, duration_s, notes,
+                   greatest(coalesce(version, 1), 1) AS version
+            FROM import_sets
+        ) AS s
+        ORDER BY id, version DESC
+    ),
+    merged AS (
+        INSERT INTO workout_sets AS ws
+        (id, user_id, workout_id, position, exercise_name, reps, weight_kg, distance_m, duration_s, notes,
+         version, updated_at)
+        SELECT id, CAST(:user_id AS uuid), workout_id, position, exercise_name, reps, weight_kg, distance_m,
+               duration_s, notes, version, now()
+        FROM src
+        WHERE workout_id IN (SELECT id FROM workouts WHERE user_id = CAST(:user_id AS uuid) AND deleted_at IS NULL)
+        ON CONFLICT (id) DO UPDATE SET
+        workout_id = EXCLUDED.workout_id,
+        position = EXCLUDED.position,
+        exercise_name = EXCLUDED.exercise_name,
+        reps = EXCLUDED.reps,
+        weight_kg = EXCLUDED.weight_kg,
+        distance_m = EXCLUDED.distance_m,
+        duration_s = EXCLUDED.duration_s,
+        notes = EXCLUDED.notes,
+        version = EXCLUDED.version,
+        updated_at = EXCLUDED.updated_at,
+        deleted_at = NULL,
+        change_seq = nextval('sync_change_seq')
+        WHERE ws.user_id = EXCLUDED.user_id AND EXCLUDED.version > ws.version
+        RETURNING xmax = 0 AS inserted
+    )
+    SELECT (SELECT count(*) FROM src), count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted)
+    FROM merged
+""")
+
+
+def merge_import(db: Session, user_id: uuid.UUID, fmt: TransferFormat, table: TransferTable) -> dict[str, Any]:
+    """
+    Merge the staged upload into the user's rows. Takes lock_user only now,
+    after the (possibly long) COPY, so pushes are blocked just for the merge.
+    Does not commit. Returns per-table inserted/updated/skipped counts plus
+    whether anything changed.
+    """
+    if fmt == "ndjson":
+        _unpack_docs(db, table)
+
+    lock_user(db, user_id)
+    result: dict[str, Any] = {}
+    for name, stmt in (("workouts", _MERGE_WORKOUTS), ("sets", _MERGE_SETS)):
+        staged, inserted, updated = db.execute(stmt, {"user_id": str(user_id)}).one()
+        result[name] = {"inserted": inserted, "updated": updated, "skipped": staged - inserted - updated}
+
+    changed = any(r["inserted"] or r["updated"] for r in result.values())
+    if changed:
+        bump_change_watermark(db, user_id)
+        # An import can touch any number of periods; recounting the user's
+        # workouts once is cheaper than a delta per row.
+        replace_user_rollups(db, user_id)
+    result["changed"] = changed
+    return result
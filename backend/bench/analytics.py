@@ -0,0 +1,178 @@
+"""
+Lift analytics benchmark: vectorized compute_lift_analytics vs. a plain
+per-set Python loop, on synthetic data.
+
+    python -m bench.analytics --sets 200000 --output analytics.json
+
+With --db it also seeds one user with that many sets in DATABASE_URL and
+times GET /stats/lifts in-process, cold (load + compute) and warm (cached).
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Callable
+
+import numpy as np
+
+from app.services.analytics import E1RM_MAX_REPS, SetColumns, compute_lift_analytics
+
+EXERCISES = ["squat", "bench press", "deadlift", "overhead press", "barbell row", "pull-up", "dip", "lunge",
+             "romanian deadlift", "front squat", "incline bench", "curl"]
+
+
+def synthetic_sets(n: int, seed: int) -> SetColumns:
+    rng = np.random.default_rng(seed)
+    day0 = 19000  # 2022-01-08
+    names = sorted(EXERCISES)
+    return SetColumns(
+        names=names,
+        exercise=rng.integers(0, len(names), n),
+        reps=rng.integers(1, 16, n),
+        weight_kg=np.round(rng.uniform(20, 220, n) * 2) / 2,
+        day=day0 + rng.integers(0, 4 * 365, n),
+    )
+
+
+def naive_prs(cols: SetColumns) -> dict[str, dict[str, float]]:
+    """Row-at-a-time reference: per-exercise PRs, weekly tonnage and weekly best e1RM."""
+    best: dict[str, dict[str, float]] = defaultdict(lambda: {"max_weight": 0.0, "best_e1rm": 0.0, "best_set_volume": 0.0})
+    tonnage: dict[tuple[str, int], float] = defaultdict(float)
+    weekly_e1rm: dict[tuple[str, int], float] = defaultdict(float)
+    for code, reps, kg, day in zip(cols.exercise.tolist(), cols.reps.tolist(), cols.weight_kg.tolist(), cols.day.tolist()):
+        name = cols.names[code]
+        b = best[name]
+        b["max_weight"] = max(b["max_weight"], kg)
+        b["best_set_volume"] = max(b["best_set_volume"], kg * reps)
+        week = (name, (day + 3) // 7)
+        if reps <= E1RM_MAX_REPS:
+            e1rm = kg if reps == 1 else kg * (1 + reps / 30.0)
+            b["best_e1rm"] = max(b["best_e1rm"], e1rm)
+            weekly_e1rm[week] = max(weekly_e1rm[week], e1rm)
+        tonnage[week] += kg * reps
+    return best
+
+
+def _best_of(fn: Callable[[], Any], repeat: int) -> tuple[float, Any]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _check(vectorized: list[dict[str, Any]], naive: dict[str, dict[str, float]]) -> bool:
+    for e in vectorized:
+        ref = naive[e["exercise"]]
+        got = {
+            "max_weight": e["prs"]["max_weight"]["weight_kg"],
+            "best_e1rm": e["prs"]["best_e1rm"]["e1rm_kg"],
+            "best_set_volume": e["prs"]["best_set_volume"]["volume_kg"],
+        }
+        if any(abs(got[k] - round(ref[k], 2)) > 0.01 for k in got):
+            return False
+    return len(vectorized) == len(naive)
+
+
+async def _endpoint_timings(cols: SetColumns, repeat: int) -> dict[str, Any]:
+    import httpx
+    from sqlalchemy import text
+
+    from app.api.deps import resolve_user_id
+    from app.db.session import dispose_engine, init_engine, run_db
+    from app.main import app
+
+    init_engine()
+
+    def seed(db, user_id: uuid.UUID) -> None:
+        workout_ids = [str(uuid.uuid4()) for _ in range(int(cols.day.max() - cols.day.min()) + 1)]
+        db.execute(
+            text("""
+                INSERT INTO workouts (id, user_id, type, started_at, version, updated_at)
+                SELECT w.id, CAST(:user_id AS uuid), 'lift', to_timestamp(CAST(:day0 AS bigint) * 86400 + (w.i - 1) * 86400), 1, now()
+                FROM unnest(CAST(:ids AS uuid[])) WITH ORDINALITY AS w(id, i)
+            """),
+            {"user_id": str(user_id), "ids": workout_ids, "day0": int(cols.day.min())},
+        )
+        db.execute(
+            text("""
+                INSERT INTO workout_sets (id, user_id, workout_id, position, exercise_name, reps, weight_kg, version, updated_at)
+                SELECT gen_random_uuid(), CAST(:user_id AS uuid), (CAST(:ids AS uuid[]))[v.day - :day0 + 1], v.i,
+                       v.name, v.reps, v.kg, 1, now()
+                FROM unnest(CAST(:names AS text[]), CAST(:reps AS integer[]), CAST(:kg AS numeric[]),
+                            CAST(:days AS integer[])) WITH ORDINALITY AS v(name, reps, kg, day, i)
+            """),
+            {
+                "user_id": str(user_id), "ids": workout_ids, "day0": int(cols.day.min()),
+                "names": [cols.names[i] for i in cols.exercise.tolist()], "reps": cols.reps.tolist(), "kg": cols.weight_kg.tolist(),
+                "days": cols.day.tolist(),
+            },
+        )
+        db.commit()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=300) as client:
+        resp = await client.post("/auth/signup", json={"email": f"bench-analytics-{uuid.uuid4().hex[:8]}@example.com", "password": "bench-pw"})
+        resp.raise_for_status()
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+        user_id = await resolve_user_id(resp.json()["access_token"])
+        await run_db(seed, user_id)
+
+        start = time.perf_counter()
+        resp = await client.get("/stats/lifts", headers=headers)
+        cold = time.perf_counter() - start
+        resp.raise_for_status()
+
+        warm = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            (await client.get("/stats/lifts", headers=headers)).raise_for_status()
+            warm = min(warm, time.perf_counter() - start)
+
+    await dispose_engine()
+    return {"user_id": str(user_id), "cold_ms": round(cold * 1000, 2), "warm_ms": round(warm * 1000, 2)}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.analytics", description=__doc__.split("\n\n")[1])
+    parser.add_argument("--sets", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5, help="best-of runs per timing")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", action="store_true", help="also time the endpoint against a seeded user")
+    parser.add_argument("--output", default=None, help="write the JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    cols = synthetic_sets(args.sets, args.seed)
+    vec_s, vectorized = _best_of(lambda: compute_lift_analytics(cols), args.repeat)
+    naive_s, naive = _best_of(lambda: naive_prs(cols), max(1, args.repeat // 2))
+
+    report: dict[str, Any] = {
+        "sets": args.sets,
+        "exercises": len(vectorized),
+        "vectorized_ms": round(vec_s * 1000, 2),
+        "naive_python_ms": round(naive_s * 1000, 2),
+        "speedup": round(naive_s / vec_s, 1),
+        "results_match": _check(vectorized, naive),
+    }
+    if args.db:
+        report["endpoint"] = asyncio.run(_endpoint_timings(cols, args.repeat))
+
+    print(
+        f"{args.sets} sets: vectorized {report['vectorized_ms']} ms, naive {report['naive_python_ms']} ms "
+        f"({report['speedup']}x), match={report['results_match']}",
+        file=sys.stderr,
+    )
+    out = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+"""
+Multi-device sync load generator.
+
+Simulates N users x M devices against the API and reports throughput,
+per-endpoint latency percentiles and DB queries per request as JSON, so
+runs can be diffed over time.
+
+    docker compose up -d db && alembic upgrade head
+    python -m bench.loadgen --users 20 --devices 3 --duration 60 --output run.json
+
+By default the app is driven in-process through httpx's ASGI transport,
+against whatever DATABASE_URL points at; this is also what lets us count
+DB queries per request. Pass --base-url to load an already running server
+(e.g. uvicorn with several workers) instead; query counts then come from
+the server's /metrics, diffed over the run (single worker, or they only
+cover whichever worker answered the scrape).
+
+Each device:
+  1. flushes an offline backlog (--backlog ops, pushed 50 at a time like
+     the mobile client) and does a full pull,
+  2. then polls: occasionally creates or edits workouts, pushes, pulls
+     until caught up, sleeps --poll-interval (jittered),
+  3. with probability --contention edits the user's shared "hot" workout,
+     so devices of the same user race on one row and produce conflicts.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import random
+import re
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import httpx
+
+PUSH_BATCH = 50  # same page size as mobile/src/sync.ts
+
+_ENDPOINT_ROUTES = {"/auth/signup": "signup", "/sync/push": "push", "/sync/pull": "pull"}
+_DB_QUERIES_SAMPLE = re.compile(r'^http_request_db_queries_(sum|count)\{method="[A-Z]+",route="([^"]+)"\} (\S+)$')
+
+# Set around each request so SQL issued while serving it can be attributed
+# to it (in-process mode only; the app inherits the caller's context).
+_query_counter: contextvars.ContextVar[list[int] | None] = contextvars.ContextVar("bench_query_counter", default=None)
+
+
+def _count_query(*_: Any) -> None:
+    counter = _query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def _install_query_counter() -> None:
+    from sqlalchemy import event
+
+    from app.db import session
+
+    engine = session.async_engine.sync_engine if session.async_engine is not None else session.engine
+    event.listen(engine, "before_cursor_execute", _count_query)
+
+
+async def _scrape_db_queries(client: httpx.AsyncClient) -> dict[str, tuple[float, float]] | None:
+    """endpoint -> (queries, requests) so far, from the server's /metrics."""
+    try:
+        resp = await client.get("/metrics")
+    except httpx.HTTPError:
+        return None
+    if resp.status_code != 200:
+        return None
+    totals: dict[str, list[float]] = {}
+    for line in resp.text.splitlines():
+        m = _DB_QUERIES_SAMPLE.match(line)
+        if m and m.group(2) in _ENDPOINT_ROUTES:
+            entry = totals.setdefault(_ENDPOINT_ROUTES[m.group(2)], [0.0, 0.0])
+            entry[0 if m.group(1) == "sum" else 1] += float(m.group(3))
+    return {k: (v[0], v[1]) for k, v in totals.items()}
+
+
+@dataclass
+class EndpointStats:
+    latencies: list[float] = field(default_factory=list)
+    queries: list[int] = field(default_factory=list)
+    errors: int = 0
+    throttled: int = 0  # 429/503 admission refusals, also counted in errors
+
+    def summary(self, wall_s: float) -> dict[str, Any]:
+        lat = sorted(self.latencies)
+
+        def pct(p: float) -> float | None:
+            if not lat:
+                return None
+            return round(lat[min(len(lat) - 1, int(p / 100 * len(lat)))] * 1000, 2)
+
+        return {
+            "count": len(lat),
+            "errors": self.errors,
+            "throttled": self.throttled,
+            "rps": round(len(lat) / wall_s, 2) if wall_s else None,
+            "mean_ms": round(sum(lat) / len(lat) * 1000, 2) if lat else None,
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "p99_ms": pct(99),
+            "max_ms": round(lat[-1] * 1000, 2) if lat else None,
+            "db_queries_per_request": round(sum(self.queries) / len(self.queries), 2) if self.queries else None,
+        }
+
+
+@dataclass
+class Stats:
+    count_queries: bool
+    endpoints: dict[str, EndpointStats] = field(default_factory=dict)
+    ops_pushed: int = 0
+    conflicts: int = 0
+    rows_pulled: int = 0
+    pulls_not_modified: int = 0
+
+    async def timed(self, name: str, send) -> httpx.Response:
+        counter = [0]
+        token = _query_counter.set(counter)
+        start = time.perf_counter()
+        try:
+            resp = await send()
+        finally:
+            _query_counter.reset(token)
+        elapsed = time.perf_counter() - start
+
+        ep = self.endpoints.setdefault(name, EndpointStats())
+        ep.latencies.append(elapsed)
+        if self.count_queries:
+            ep.queries.append(counter[0])
+        if resp.status_code >= 400:
+            ep.errors += 1
+            if resp.status_code in (429, 503):
+                ep.throttled += 1
+        return resp
+
+
+@dataclass
+class SimUser:
+    email: str
+    token: str
+    hot_workout_id: str
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+@dataclass
+class Device:
+    user: SimUser
+    rng: random.Random
+    cursor: str | None = None
+    etag: str | None = None
+    versions: dict[str, int] = field(default_factory=dict)
+    workouts: dict[str, dict[str, Any]] = field(default_factory=dict)
+    pending: list[dict[str, Any]] = field(default_factory=list)
+
+
+def _op(op_type: str, entity_id: str, payload: dict[str, Any] | None = None) -> dict[str, Any]:
+    return {
+        "op_id": str(uuid.uuid4()),
+        "type": op_type,
+        "entity_id": entity_id,
+        "payload": payload,
+        "client_updated_at": int(time.time() * 1000),
+    }
+
+
+def _new_workout(rng: random.Random, workout_id: str | None = None) -> dict[str, Any]:
+    started = datetime.now(timezone.utc) - timedelta(days=rng.randint(0, 365), minutes=rng.randint(0, 1440))
+    kind = rng.choice(["run", "lift"])
+    return {
+        "id": workout_id or str(uuid.uuid4()),
+        "type": kind,
+        "started_at": started.isoformat(),
+        "notes": rng.choice([None, "easy", "tempo", "legs", "push day", "felt great"]),
+        "distance_m": rng.randint(2000, 21000) if kind == "run" else None,
+        "duration_s": rng.randint(900, 7200),
+        "rpe": rng.randint(3, 10),
+        "version": 0,
+    }
+
+
+def _workout_ops(dev: Device, w: dict[str, Any]) -> list[dict[str, Any]]:
+    ops = [_op("UPSERT_WORKOUT", w["id"], w)]
+    if w["type"] == "lift":
+        for i in range(dev.rng.randint(3, 12)):
+            set_id = str(uuid.uuid4())
+            ops.append(
+                _op(
+                    "UPSERT_SET",
+                    set_id,
+                    {
+                        "id": set_id,
+                        "workout_id": w["id"],
+                        "position": i,
+                        "exercise_name": dev.rng.choice(["squat", "bench", "deadlift", "row", "press"]),
+                        "reps": dev.rng.randint(1, 12),
+                        "weight_kg": dev.rng.randint(20, 200) + dev.rng.choice([0, 0.5]),
+                        "version": 0,
+                    },
+                )
+            )
+    return ops
+
+
+def _edit_ops(dev: Device) -> list[dict[str, Any]]:
+    if not dev.workouts or dev.rng.random() < 0.5:
+        w = _new_workout(dev.rng)
+        dev.workouts[w["id"]] = w
+        return _workout_ops(dev, w)
+    w = dict(dev.workouts[dev.rng.choice(list(dev.workouts))])
+    if dev.rng.random() < 0.1:
+        dev.workouts.pop(w["id"])
+        return [_op("DELETE_WORKOUT", w["id"])]
+    w["notes"] = f"edited {dev.rng.randint(0, 1 << 20)}"
+    w["version"] = dev.versions.get(w["id"], 0)
+    dev.workouts[w["id"]] = w
+    return [_op("UPSERT_WORKOUT", w["id"], w)]
+
+
+def _hot_edit_ops(dev: Device) -> list[dict[str, Any]]:
+    w = _new_workout(dev.rng, dev.user.hot_workout_id)
+    w["notes"] = f"hot {dev.rng.randint(0, 1 << 20)}"
+    w["version"] = dev.versions.get(w["id"], 0)
+    return [_op("UPSERT_WORKOUT", w["id"], w)]
+
+
+async def _flush(client: httpx.AsyncClient, dev: Device, stats: Stats) -> None:
+    while dev.pending:
+        batch, dev.pending = dev.pending[:PUSH_BATCH], dev.pending[PUSH_BATCH:]
+        resp = await stats.timed(
+            "push", lambda: client.post("/sync/push", json={"ops": batch}, headers=dev.user.headers)
+        )
+        if resp.status_code != 200:
+            return
+        data = resp.json()
+        stats.ops_pushed += len(batch)
+        stats.conflicts += len(data.get("conflicts", []))
+        for ent in data.get("updated_entities", []):
+            dev.versions[ent["data"]["id"]] = ent["data"]["version"]
+
+
+async def _pull_all(client: httpx.AsyncClient, dev: Device, stats: Stats) -> None:
+    while True:
+        params = {"cursor": dev.cursor} if dev.cursor else {}
+        headers = dev.user.headers | ({"If-None-Match": dev.etag} if dev.etag else {})
+        dev.etag = None
+        resp = await stats.timed(
+            "pull", lambda: client.get("/sync/pull", params=params, headers=headers)
+        )
+        if resp.status_code == 304:
+            dev.etag = resp.headers.get("etag")
+            stats.pulls_not_modified += 1
+            return
+        if resp.status_code != 200:
+            return
+        data = resp.json()
+        for row in [*data.get("workouts", []), *data.get("sets", [])]:
+            dev.versions[row["id"]] = row["version"]
+        stats.rows_pulled += len(data.get("workouts", [])) + len(data.get("sets", []))
+        dev.cursor = data.get("next_cursor") or dev.cursor
+        if not data.get("has_more"):
+            dev.etag = resp.headers.get("etag")
+            return
+
+
+async def _run_device(client: httpx.AsyncClient, dev: Device, stats: Stats, args: argparse.Namespace, deadline: float) -> None:
+    # offline backlog flush, then initial full sync
+    while len(dev.pending) < args.backlog:
+        dev.pending.extend(_edit_ops(dev))
+    await _flush(client, dev, stats)
+    await _pull_all(client, dev, stats)
+
+    # steady-state polling
+    while time.monotonic() < deadline:
+        if dev.rng.random() < args.contention:
+            dev.pending.extend(_hot_edit_ops(dev))
+        elif dev.rng.random() < args.edit_rate:
+            dev.pending.extend(_edit_ops(dev))
+        await _flush(client, dev, stats)
+        await _pull_all(client, dev, stats)
+        await asyncio.sleep(args.poll_interval * dev.rng.uniform(0.5, 1.5))
+
+
+async def _signup(client: httpx.AsyncClient, run_id: str, i: int, stats: Stats) -> SimUser:
+    email = f"bench-{run_id}-{i}@example.com"
+    resp = await stats.timed("signup", lambda: client.post("/auth/signup", json={"email": email, "password": "bench-pw"}))
+    resp.raise_for_status()
+    return SimUser(email=email, token=resp.json()["access_token"], hot_workout_id=str(uuid.uuid4()))
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    in_process = args.base_url is None
+    if in_process:
+        from app.db.session import dispose_engine, init_engine
+        from app.main import app
+
+        # httpx's ASGI transport doesn't run the lifespan hook
+        init_engine()
+        _install_query_counter()
+        transport: httpx.AsyncBaseTransport = httpx.ASGITransport(app=app)
+        base_url = "http://bench"
+    else:
+        transport = httpx.AsyncHTTPTransport(retries=0)
+        base_url = args.base_url
+
+    stats = Stats(count_queries=in_process)
+    run_id = uuid.uuid4().hex[:8]
+    rng = random.Random(args.seed)
+
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout) as client:
+        users = [await _signup(client, run_id, i, stats) for i in range(args.users)]
+        devices = [
+            Device(user=u, rng=random.Random(rng.random()))
+            for u in users
+            for _ in range(args.devices)
+        ]
+
+        before = None if in_process else await _scrape_db_queries(client)
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(_run_device(client, d, stats, args, deadline) for d in devices))
+        wall_s = time.monotonic() - started
+        after = None if in_process else await _scrape_db_queries(client)
+
+    if in_process:
+        await dispose_engine()
+
+    endpoints = {name: ep.summary(wall_s) for name, ep in sorted(stats.endpoints.items())}
+    if before is not None and after is not None:
+        for name, (queries, requests) in after.items():
+            q0, r0 = before.get(name, (0.0, 0.0))
+            if name in endpoints and requests > r0:
+                endpoints[name]["db_queries_per_request"] = round((queries - q0) / (requests - r0), 2)
+
+    sync_requests = sum(len(ep.latencies) for name, ep in stats.endpoints.items() if name != "signup")
+    return {
+        "run_id": run_id,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            k: v for k, v in vars(args).items() if k != "output"
+        } | {"mode": "in-process" if in_process else "http"},
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(sync_requests / wall_s, 2) if wall_s else None,
+        "ops_pushed": stats.ops_pushed,
+        "conflicts": stats.conflicts,
+        "rows_pulled": stats.rows_pulled,
+        "pulls_not_modified": stats.pulls_not_modified,
+        "endpoints": endpoints,
+    }
+
+
+def _print_summary(report: dict[str, Any]) -> None:
+    print(
+        f"{report['config']['users']} users x {report['config']['devices']} devices, "
+        f"{report['wall_s']}s, {report['throughput_rps']} req/s, "
+        f"{report['ops_pushed']} ops pushed, {report['conflicts']} conflicts",
+        file=sys.stderr,
+    )
+    print(f"{'endpoint':<10}{'count':>8}{'err':>6}{'thr':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'q/req':>8}", file=sys.stderr)
+    for name, ep in report["endpoints"].items():
+        print(
+            f"{name:<10}{ep['count']:>8}{ep['errors']:>6}{ep['throttled']:>6}{ep['p50_ms'] or '-':>9}{ep['p95_ms'] or '-':>9}"
+            f"{ep['p99_ms'] or '-':>9}{ep['db_queries_per_request'] or '-':>8}",
+            file=sys.stderr,
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.loadgen", description=__doc__.split("\n\n")[1])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--devices", type=int, default=2, help="devices per user")
+    parser.add_argument("--duration", type=float, default=30.0, help="steady-state seconds after the backlog flush")
+    parser.add_argument("--backlog", type=int, default=100, help="offline ops each device starts with")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="mean seconds between sync cycles")
+    parser.add_argument("--edit-rate", type=float, default=0.3, help="chance a cycle carries local edits")
+    parser.add_argument("--contention", type=float, default=0.05, help="chance a cycle edits the user's shared hot workout")
+    parser.add_argument("--base-url", default=None, help="load a running server instead of the in-process app")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="write the JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    _print_summary(report)
+    out = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Pull serialization benchmark: pages assembled by Postgres (json_agg, the
+default) vs. built row by row in Python (SYNC_PULL_SQL_JSON=False), for
+both JSON and columnar JSON.
+
+    python -m bench.pull --workouts 5000 --sets-per-workout 5 --output pull.json
+
+Seeds one user in DATABASE_URL, then times a full pull (every page, in
+process) per path and format and checks both paths return the same pages.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from typing import Any
+
+from app.core.encoding import COLUMNAR_JSON, JSON
+
+FORMATS = {"json": JSON, "columnar": COLUMNAR_JSON}
+
+
+async def _run(workouts: int, sets_per_workout: int, limit: int, repeat: int) -> dict[str, Any]:
+    import httpx
+    from sqlalchemy import text
+
+    from app.api.deps import resolve_user_id
+    from app.core.config import settings
+    from app.db.session import dispose_engine, init_engine, run_db
+    from app.main import app
+
+    init_engine()
+
+    def seed(db, user_id: uuid.UUID) -> None:
+        db.execute(
+            text("""
+                INSERT INTO workouts (id, user_id, type, started_at, notes, distance_m, duration_s, rpe, version, updated_at)
+                SELECT gen_random_uuid(), CAST(:user_id AS uuid), 'lift', now() - i * interval '1 day',
+                       CASE WHEN i % 3 = 0 THEN 'felt "strong"' END, CASE WHEN i % 2 = 0 THEN i * 10 END,
+                       3600, i % 10 + 1, 1, now()
+                FROM generate_series(1, :n) AS i
+            """),
+            {"user_id": str(user_id), "n": workouts},
+        )
+        db.execute(
+            text("""
+                INSERT INTO workout_sets (id, user_id, workout_id, position, exercise_name, reps, weight_kg, version, updated_at)
+                SELECT gen_random_uuid(), w.user_id, w.id, p, 'squat', 5, 100 + p * 2.5, 1, now()
+                FROM workouts AS w, generate_series(1, :k) AS p
+                WHERE w.user_id = CAST(:user_id AS uuid)
+            """),
+            {"user_id": str(user_id), "k": sets_per_workout},
+        )
+        db.commit()
+
+    async def full_pull(client: httpx.AsyncClient, headers: dict[str, str]) -> tuple[list[dict[str, Any]], int]:
+        pages, size, cursor = [], 0, None
+        while True:
+            params: dict[str, Any] = {"limit": limit, **({"cursor": cursor} if cursor else {"since": 0})}
+            resp = await client.get("/sync/pull", params=params, headers=headers)
+            resp.raise_for_status()
+            size += len(resp.content)
+            page = resp.json()
+            page.pop("server_time_ms")
+            pages.append(page)
+            cursor = page["next_cursor"]
+            if not page["has_more"]:
+                return pages, size
+
+    report: dict[str, Any] = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=300) as client:
+        resp = await client.post("/auth/signup", json={"email": f"bench-pull-{uuid.uuid4().hex[:8]}@example.com", "password": "bench-pw"})
+        resp.raise_for_status()
+        token = resp.json()["access_token"]
+        await run_db(seed, await resolve_user_id(token))
+
+        saved = settings.SYNC_PULL_SQL_JSON
+        try:
+            for name, media_type in FORMATS.items():
+                headers = {"Authorization": f"Bearer {token}", "Accept": media_type}
+                timings, results = {}, {}
+                for path, sql_json in (("python", False), ("postgres", True)):
+                    settings.SYNC_PULL_SQL_JSON = sql_json
+                    best = float("inf")
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        results[path] = await full_pull(client, headers)
+                        best = min(best, time.perf_counter() - start)
+                    timings[path] = best
+                pages, size = results["postgres"]
+                report[name] = {
+                    "pages": len(pages),
+                    "bytes": size,
+                    "python_ms": round(timings["python"] * 1000, 2),
+                    "postgres_ms": round(timings["postgres"] * 1000, 2),
+                    "speedup": round(timings["python"] / timings["postgres"], 2),
+                    "results_match": pages == results["python"][0],
+                }
+        finally:
+            settings.SYNC_PULL_SQL_JSON = saved
+
+    await dispose_engine()
+    return report
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.pull", description=__doc__.split("\n\n")[1])
+    parser.add_argument("--workouts", type=int, default=5000)
+    parser.add_argument("--sets-per-workout", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=1000, help="pull page size")
+    parser.add_argument("--repeat", type=int, default=5, help="best-of runs per timing")
+    parser.add_argument("--output", default=None, help="write the JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    formats = asyncio.run(_run(args.workouts, args.sets_per_workout, args.limit, args.repeat))
+    report = {"workouts": args.workouts, "sets": args.workouts * args.sets_per_workout, "limit": args.limit, **formats}
+
+    for name in FORMATS:
+        r = report[name]
+        print(
+            f"{name}: python {r['python_ms']} ms, postgres {r['postgres_ms']} ms ({r['speedup']}x), "
+            f"{r['pages']} pages, match={r['results_match']}",
+            file=sys.stderr,
+        )
+    out = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+
+
+if __name__ == "__main__":
+    main()
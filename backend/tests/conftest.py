@@ -0,0 +1,19 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db import session
+from app.main import app
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def db(client):
+    """A plain Session on the app's database, for what the API can't do (ageing rows, draining queues)."""
+    session.init_engine(use_async=False)
+    with session.SessionLocal() as s:
+        yield s
@@ -0,0 +1,64 @@
+"""
+Accounts, sync ops and tombstone ageing for the tests. The `client` and
+`db` fixtures live in conftest.py.
+"""
+
+import uuid
+from typing import Any, NamedTuple
+
+from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.maintenance import compact_tombstones
+
+STARTED_AT = "2026-03-04T10:00:00Z"
+
+
+class Account(NamedTuple):
+    id: uuid.UUID
+    headers: dict[str, str]
+
+
+def signup(client: TestClient) -> Account:
+    email = f"test-{uuid.uuid4().hex[:12]}@example.com"
+    token = client.post("/auth/signup", json={"email": email, "password": "pw"}).json()["access_token"]
+    return Account(uuid.UUID(jwt.get_unverified_claims(token)["sub"]), {"Authorization": f"Bearer {token}"})
+
+
+def op(type: str, entity_id: str, payload: dict[str, Any] | None = None, op_id: str | None = None) -> dict[str, Any]:
+    return {
+        "op_id": op_id or str(uuid.uuid4()),
+        "type": type,
+        "entity_id": entity_id,
+        "payload": payload,
+        "client_updated_at": 1,
+    }
+
+
+def workout_op(workout_id: str | None = None, started_at: str = STARTED_AT, op_id: str | None = None) -> dict[str, Any]:
+    workout_id = workout_id or str(uuid.uuid4())
+    return op("UPSERT_WORKOUT", workout_id, {"id": workout_id, "type": "run", "started_at": started_at}, op_id)
+
+
+def set_op(set_id: str, workout_id: str, weight_kg: float = 100) -> dict[str, Any]:
+    payload = {"id": set_id, "workout_id": workout_id, "exercise_name": "squat", "reps": 5, "weight_kg": weight_kg}
+    return op("UPSERT_SET", set_id, payload)
+
+
+def push(client: TestClient, account: Account, ops: list[dict[str, Any]]) -> dict[str, Any]:
+    r = client.post("/sync/push", json={"ops": ops}, headers=account.headers)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def age_and_compact(db: Session, table: str, entity_id: str) -> None:
+    """Push a tombstone past the horizon and purge it."""
+    db.execute(
+        text(f"UPDATE {table} SET deleted_at = now() - make_interval(days => :days) WHERE id = :id"),
+        {"id": entity_id, "days": settings.SYNC_TOMBSTONE_HORIZON_DAYS + 1},
+    )
+    db.commit()
+    compact_tombstones(db)
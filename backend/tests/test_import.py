@@ -0,0 +1,29 @@
+"""
+/import merges. Needs the database from DATABASE_URL, migrated to head:
+
+    cd backend && python -m pytest -q tests
+"""
+
+import json
+import uuid
+
+from helpers import op, push, set_op, signup, workout_op
+
+
+def test_sets_of_a_deleted_workout_are_skipped(client):
+    account = signup(client)
+    workout_id, set_id = str(uuid.uuid4()), str(uuid.uuid4())
+    push(client, account, [workout_op(workout_id), set_op(set_id, workout_id)])
+    push(client, account, [op("DELETE_WORKOUT", workout_id)])
+
+    # A new set and a newer version of the tombstoned one, both under the deleted workout.
+    lines = [
+        {"kind": "workout_set", "data": {"id": str(uuid.uuid4()), "workout_id": workout_id, "reps": 5, "weight_kg": 100}},
+        {"kind": "workout_set", "data": {"id": set_id, "workout_id": workout_id, "reps": 5, "weight_kg": 100, "version": 9}},
+    ]
+    r = client.post("/import", content="\n".join(json.dumps(line) for line in lines).encode(), headers=account.headers)
+    assert r.status_code == 200, r.text
+    assert r.json()["sets"] == {"inserted": 0, "updated": 0, "skipped": 2}
+
+    sets = client.get("/sync/pull", headers=account.headers).json()["sets"]
+    assert [(s["id"], s["deleted_at"] is not None) for s in sets] == [(set_id, True)]
@@ -0,0 +1,33 @@
+"""
+/stats/lifts caching. Needs the database from DATABASE_URL, migrated to
+head:
+
+    cd backend && python -m pytest -q tests
+"""
+
+import uuid
+
+from fastapi.testclient import TestClient
+
+from helpers import Account, age_and_compact, op, push, set_op, signup, workout_op
+
+
+def _max_weight(client: TestClient, account: Account) -> float:
+    r = client.get("/stats/lifts", headers=account.headers)
+    assert r.status_code == 200, r.text
+    return r.json()["exercises"][0]["prs"]["max_weight"]["weight_kg"]
+
+
+def test_compaction_does_not_revive_cached_lifts(client, db):
+    account = signup(client)
+    workout_id, heavy, light = (str(uuid.uuid4()) for _ in range(3))
+    push(client, account, [workout_op(workout_id), set_op(heavy, workout_id, 150)])
+    push(client, account, [set_op(light, workout_id, 100)])
+    assert _max_weight(client, account) == 150
+
+    # The tombstone is the only row newer than the cached result, and
+    # compaction takes it away again.
+    push(client, account, [op("DELETE_SET", heavy)])
+    age_and_compact(db, "workout_sets", heavy)
+
+    assert _max_weight(client, account) == 100
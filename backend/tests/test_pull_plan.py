@@ -0,0 +1,19 @@
+"""
+Pull must stay on its indexes. Needs the database from DATABASE_URL,
+migrated to head:
+
+    cd backend && python -m pytest -q tests
+
+`python -m app.cli check-pull-plan` runs the same check against any
+database, printing the scans it found.
+"""
+
+import pytest
+
+from app.cli import _PULL_PLAN_CASES, _pull_plan
+
+
+@pytest.mark.parametrize("case", sorted(_PULL_PLAN_CASES))
+def test_pull_query_plans_no_seq_scan(db, case):
+    nodes = _pull_plan(db, *_PULL_PLAN_CASES[case])
+    assert [n["Node Type"] for n in nodes if n["Node Type"] == "Seq Scan"] == [], nodes
@@ -0,0 +1,62 @@
+"""
+Pull vs tombstone compaction. Needs the database from DATABASE_URL,
+migrated to head:
+
+    cd backend && python -m pytest -q tests
+"""
+
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from helpers import Account, age_and_compact, op, push, signup, workout_op
+
+
+def _pull_pages(client: TestClient, account: Account, cursor: str | None, limit: int) -> tuple[list[str], str]:
+    ids: list[str] = []
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        r = client.get("/sync/pull", params=params, headers=account.headers)
+        assert r.status_code == 200, (len(ids), r.text)
+        page = r.json()
+        ids += [w["id"] for w in page["workouts"]]
+        cursor = page["next_cursor"] or cursor
+        if not page["has_more"]:
+            return ids, cursor
+
+
+@pytest.mark.parametrize("sql_json", [True, False])
+def test_full_sync_pages_through_after_compaction(client, db, monkeypatch, sql_json):
+    monkeypatch.setattr(settings, "SYNC_PULL_SQL_JSON", sql_json)
+    account = signup(client)
+    ids = [str(uuid.uuid4()) for _ in range(6)]
+    push(client, account, [workout_op(i) for i in ids])
+    # The tombstone takes the newest change_seq, past the first page's rows.
+    push(client, account, [op("DELETE_WORKOUT", ids[2])])
+    age_and_compact(db, "workouts", ids[2])
+
+    pulled, cursor = _pull_pages(client, account, None, limit=2)
+    assert sorted(pulled) == sorted(set(ids) - {ids[2]})
+
+    # Caught up: the purged tombstone is newer than the last row it saw, but
+    # it was purged before this sync began.
+    r = client.get("/sync/pull", params={"cursor": cursor}, headers=account.headers)
+    assert r.status_code == 200, r.text
+    assert r.json()["workouts"] == []
+
+
+def test_cursor_from_before_compaction_needs_resync(client, db):
+    account = signup(client)
+    ids = [str(uuid.uuid4()) for _ in range(3)]
+    push(client, account, [workout_op(i) for i in ids])
+    _, cursor = _pull_pages(client, account, None, limit=2)
+
+    push(client, account, [op("DELETE_WORKOUT", ids[0])])
+    age_and_compact(db, "workouts", ids[0])
+
+    # This client holds ids[0] and never saw it deleted.
+    r = client.get("/sync/pull", params={"cursor": cursor}, headers=account.headers)
+    assert r.status_code == 410
+    assert client.get("/sync/pull/stream", params={"cursor": cursor}, headers=account.headers).status_code == 410
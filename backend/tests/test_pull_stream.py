@@ -0,0 +1,37 @@
+"""
+/sync/pull/stream admission. Needs the database from DATABASE_URL,
+migrated to head:
+
+    cd backend && python -m pytest -q tests
+"""
+
+import json
+
+from app.api import sync
+from app.core.ratelimit import AdmissionGate
+from helpers import push, signup, workout_op
+
+
+def test_stream_holds_an_admission_slot(client, monkeypatch):
+    account = signup(client)
+    push(client, account, [workout_op()])
+
+    gate = AdmissionGate(1, 0.05)
+    monkeypatch.setattr(sync, "db_admission", gate)
+    held = []
+    ndjson = sync._ndjson
+    monkeypatch.setattr(sync, "_ndjson", lambda obj: held.append(gate._slots.locked()) or ndjson(obj))
+
+    for _ in range(2):  # the slot comes back once the stream is done
+        r = client.get("/sync/pull/stream", headers=account.headers)
+        assert r.status_code == 200, r.text
+        lines = [json.loads(line) for line in r.text.splitlines()]
+        assert [line["kind"] for line in lines] == ["workout", "end"]
+    assert held and all(held)
+    assert not gate._slots.locked()
+
+    # With no slot free, the stream is shed like any other pull.
+    monkeypatch.setattr(sync, "db_admission", AdmissionGate(0, 0.05))
+    r = client.get("/sync/pull/stream", headers=account.headers)
+    assert r.status_code == 503
+    assert r.headers["Retry-After"]
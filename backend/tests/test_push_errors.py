@@ -0,0 +1,36 @@
+"""
+Which push errors are the op's fault. Needs the database from
+DATABASE_URL, migrated to head:
+
+    cd backend && python -m pytest -q tests
+"""
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.api import sync
+from helpers import push, signup, workout_op
+
+
+def test_bad_payload_fails_only_its_op(client):
+    account = signup(client)
+    good, bad = workout_op(), workout_op(started_at="not-a-date")
+    r = push(client, account, [good, bad])
+    assert r["applied_op_ids"] == [good["op_id"]]
+    assert [(f["op_id"], f["reason"]) for f in r["failed"]] == [(bad["op_id"], "invalid_payload")]
+
+
+def test_database_trouble_fails_the_whole_push(client, monkeypatch):
+    account = signup(client)
+    op = workout_op()
+
+    def lost_connection(*args, **kwargs):
+        raise OperationalError("SELECT ...", {}, Exception("server closed the connection unexpectedly"))
+
+    with monkeypatch.context() as m:
+        m.setattr(sync, "_fetch_workouts", lost_connection)
+        # Not parked in `failed`: the client keeps the op and resends it.
+        with pytest.raises(OperationalError):
+            client.post("/sync/push", json={"ops": [op]}, headers=account.headers)
+
+    assert push(client, account, [op])["applied_op_ids"] == [op["op_id"]]
@@ -0,0 +1,38 @@
+"""
+Push vs rows owned by another user. Needs the database from DATABASE_URL,
+migrated to head:
+
+    cd backend && python -m pytest -q tests
+"""
+
+import uuid
+
+from helpers import op, push, set_op, signup, workout_op
+
+
+def test_ids_of_another_user_are_conflicts(client):
+    owner, other = signup(client), signup(client)
+    workout_id, set_id = str(uuid.uuid4()), str(uuid.uuid4())
+    push(client, owner, [workout_op(workout_id), set_op(set_id, workout_id)])
+
+    ops = [workout_op(workout_id), set_op(str(uuid.uuid4()), workout_id), set_op(set_id, str(uuid.uuid4()))]
+    r = push(client, other, ops)
+    assert [c["reason"] for c in r["conflicts"]] == ["id_taken", "workout_not_found", "workout_not_found"]
+    assert r["updated_entities"] == []
+
+    pulled = client.get("/sync/pull", headers=other.headers).json()
+    assert pulled["workouts"] == [] and pulled["sets"] == []
+    pulled = client.get("/sync/pull", headers=owner.headers).json()
+    assert [w["version"] for w in pulled["workouts"]] == [1] and len(pulled["sets"]) == 1
+
+
+def test_delete_workout_tombstones_its_sets(client):
+    account = signup(client)
+    workout_id, set_id = str(uuid.uuid4()), str(uuid.uuid4())
+    push(client, account, [workout_op(workout_id), set_op(set_id, workout_id)])
+    cursor = client.get("/sync/pull", headers=account.headers).json()["next_cursor"]
+
+    push(client, account, [op("DELETE_WORKOUT", workout_id)])
+    pulled = client.get("/sync/pull", params={"cursor": cursor}, headers=account.headers).json()
+    assert [s["id"] for s in pulled["sets"]] == [set_id]
+    assert pulled["sets"][0]["deleted_at"] is not None and pulled["sets"][0]["version"] == 2
@@ -0,0 +1,63 @@
+"""
+SYNC_PUSH_MODE=queue resends. Needs the database from DATABASE_URL,
+migrated to head:
+
+    cd backend && python -m pytest -q tests
+"""
+
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.api.sync import drain_push_queue
+from app.core.config import settings
+from helpers import Account, signup, workout_op
+
+
+@pytest.fixture
+def queue_mode(monkeypatch):
+    # No workers run (the app started in sync mode); tests drain by hand.
+    monkeypatch.setattr(settings, "SYNC_PUSH_MODE", "queue")
+
+
+def _enqueue(client: TestClient, account: Account, ops: list[dict]) -> dict:
+    r = client.post("/sync/push", json={"ops": ops}, headers=account.headers)
+    assert r.status_code == 202, r.text
+    return r.json()
+
+
+def _drain(db: Session, user_id: uuid.UUID) -> None:
+    while drain_push_queue(db, user_id)[0]:
+        pass
+
+
+def _status(client: TestClient, account: Account, op_id: str) -> str:
+    return client.get("/sync/ops", params={"op_id": op_id}, headers=account.headers).json()["ops"][0]["status"]
+
+
+def test_failed_op_is_queued_again(client, db, queue_mode):
+    account = signup(client)
+    bad = workout_op(started_at="not-a-date")
+    _enqueue(client, account, [bad])
+    _drain(db, account.id)
+    assert _status(client, account, bad["op_id"]) == "failed"
+
+    assert _enqueue(client, account, [bad])["accepted_op_ids"] == [bad["op_id"]]
+    assert _status(client, account, bad["op_id"]) == "queued"
+
+
+def test_op_id_of_another_user_is_rejected(client, db, queue_mode):
+    owner, other = signup(client), signup(client)
+    op = workout_op()
+    _enqueue(client, owner, [op])
+
+    mine = workout_op()
+    theirs = workout_op(op_id=op["op_id"])
+    r = _enqueue(client, other, [mine, theirs])
+    assert r["accepted_op_ids"] == [mine["op_id"]]
+    assert [(x["op_id"], x["reason"]) for x in r["rejected"]] == [(op["op_id"], "op_id_taken")]
+
+    _drain(db, owner.id)
+    assert _status(client, owner, op["op_id"]) == "applied"
@@ -6,7 +6,7 @@ import { v4 as uuidv4 } from "uuid";
 
 import { initDb, listLocalWorkouts, upsertLocalWorkout, enqueueOp } from "./src/db";
 import { login, signup } from "./src/api";
-import { syncNow } from "./src/sync";
+import { syncNow, subscribeToChanges } from "./src/sync";
 
 type Workout = {
   id: string;
@@ -57,6 +57,16 @@ export default function App() {
     }
   }, [token, isOnline]);
 
+  useEffect(() => {
+    // Pull as soon as another device pushes, instead of waiting for a poll
+    if (!token || !isOnline) return;
+    return subscribeToChanges(token, () => {
+      syncNow(token)
+        .then(() => refreshWorkouts())
+        .catch(() => {});
+    });
+  }, [token, isOnline]);
+
   async function refreshWorkouts() {
     const rows = await listLocalWorkouts();
     setWorkouts(rows as any);
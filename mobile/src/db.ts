@@ -1,4 +1,5 @@
 import * as SQLite from "expo-sqlite";
+import { v4 as uuidv4 } from "uuid";
 
 type BindValue = SQLite.SQLiteBindValue;
 
@@ -39,6 +40,21 @@ export type WorkoutRow = {
   deleted_at: string | null;
 };
 
+export type WorkoutSetRow = {
+  id: string;
+  workout_id: string;
+  position: number;
+  exercise_name: string | null;
+  reps: number | null;
+  weight_kg: number | null;
+  distance_m: number | null;
+  duration_s: number | null;
+  notes: string | null;
+  version: number;
+  updated_at: string | null;
+  deleted_at: string | null;
+};
+
 export type SyncQueueRow = {
   op_id: string;
   type: string;
@@ -131,6 +147,39 @@ export async function upsertLocalWorkout(w: Partial<WorkoutRow> & { id: string;
   );
 }
 
+export async function upsertLocalWorkoutSet(s: Partial<WorkoutSetRow> & { id: string; workout_id: string }) {
+  await run(
+    `
+    INSERT INTO workout_sets (id,workout_id,position,exercise_name,reps,weight_kg,distance_m,duration_s,notes,version,updated_at,deleted_at)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
+    ON CONFLICT(id) DO UPDATE SET
+      workout_id=excluded.workout_id,
+      position=excluded.position,
+      exercise_name=excluded.exercise_name,
+      reps=excluded.reps,
+      weight_kg=excluded.weight_kg,
+      distance_m=excluded.distance_m,
+      duration_s=excluded.duration_s,
+      notes=excluded.notes,
+      version=excluded.version,
+      updated_at=excluded.updated_at,
+      deleted_at=excluded.deleted_at
+    `,
+    s.id,
+    s.workout_id,
+    s.position ?? 0,
+    s.exercise_name ?? null,
+    s.reps ?? null,
+    s.weight_kg ?? null,
+    s.distance_m ?? null,
+    s.duration_s ?? null,
+    s.notes ?? null,
+    s.version ?? 0,
+    s.updated_at ?? null,
+    s.deleted_at ?? null
+  );
+}
+
 export async function enqueueOp(op: {
   op_id: string;
   type: string;
@@ -152,6 +201,33 @@ export async function enqueueOp(op: {
   );
 }
 
+// Edits an existing workout locally and queues a PATCH_WORKOUT carrying only
+// the fields that actually changed (plus the version the edit was based on).
+// Returns false, queueing nothing, if no field changed.
+export async function patchLocalWorkout(
+  id: string,
+  changes: Partial<Pick<WorkoutRow, "type" | "started_at" | "notes" | "distance_m" | "duration_s" | "rpe">>
+): Promise<boolean> {
+  const [current] = await all<WorkoutRow>(`SELECT * FROM workouts WHERE id = ?`, id);
+  if (!current) return false;
+
+  const changed: Record<string, unknown> = {};
+  for (const [k, v] of Object.entries(changes)) {
+    if (v !== undefined && v !== current[k as keyof WorkoutRow]) changed[k] = v;
+  }
+  if (Object.keys(changed).length === 0) return false;
+
+  await upsertLocalWorkout({ ...current, ...changed });
+  await enqueueOp({
+    op_id: uuidv4(),
+    type: "PATCH_WORKOUT",
+    entity_id: id,
+    payload: { ...changed, version: current.version },
+    client_updated_at: Date.now(),
+  });
+  return true;
+}
+
 export async function getPendingOps(limit = 50): Promise<SyncQueueRow[]> {
   return all<SyncQueueRow>(
     `SELECT * FROM sync_queue WHERE status='PENDING' ORDER BY client_updated_at ASC LIMIT ?`,
@@ -177,6 +253,37 @@ export async function markOpsFailed(opIds: string[]) {
   );
 }
 
+// --- Full resync ---
+// After the server compacts tombstones, a client that was offline past the
+// horizon can't be told about those deletes. It re-pulls everything instead,
+// noting each id it gets back, then drops local rows the server no longer
+// has (except ones with pushes still pending).
+
+export async function beginResync() {
+  await exec(`
+    CREATE TABLE IF NOT EXISTS resync_seen (id TEXT PRIMARY KEY NOT NULL);
+    DELETE FROM resync_seen;
+  `);
+}
+
+export async function markResyncSeen(ids: string[]) {
+  if (ids.length === 0) return;
+  const placeholders = ids.map(() => "(?)").join(",");
+  await run(`INSERT OR IGNORE INTO resync_seen (id) VALUES ${placeholders}`, ...ids);
+}
+
+export async function finishResync() {
+  await exec(`
+    DELETE FROM workout_sets
+    WHERE id NOT IN (SELECT id FROM resync_seen)
+      AND id NOT IN (SELECT entity_id FROM sync_queue WHERE status='PENDING');
+    DELETE FROM workouts
+    WHERE id NOT IN (SELECT id FROM resync_seen)
+      AND id NOT IN (SELECT entity_id FROM sync_queue WHERE status='PENDING');
+    DELETE FROM resync_seen;
+  `);
+}
+
 export async function resetLocalDb() {
   // wipe local tables
   await exec(`
@@ -2,8 +2,10 @@ import AsyncStorage from "@react-native-async-storage/async-storage";
 import { resetLocalDb } from "./db";
 
 const LAST_SYNC_KEY = "last_sync_ms";
+const SYNC_CURSOR_KEY = "sync_cursor";
 
 export async function devResetAllLocal() {
   await resetLocalDb();
   await AsyncStorage.removeItem(LAST_SYNC_KEY);
+  await AsyncStorage.removeItem(SYNC_CURSOR_KEY);
 }
@@ -1,8 +1,38 @@
 import AsyncStorage from "@react-native-async-storage/async-storage";
 import { API_URL } from "./api";
-import { upsertLocalWorkout, getPendingOps, markOpsDone } from "./db";
+import {
+  upsertLocalWorkout,
+  upsertLocalWorkoutSet,
+  getPendingOps,
+  markOpsDone,
+  markOpsFailed,
+  beginResync,
+  markResyncSeen,
+  finishResync,
+} from "./db";
 
 const LAST_SYNC_KEY = "last_sync_ms";
+const SYNC_CURSOR_KEY = "sync_cursor";
+const SYNC_ETAG_KEY = "sync_etag";
+const RESYNC_KEY = "resync_pending";
+
+// Set when the server sheds us with 429/503; syncs before then fail fast
+// instead of adding to the load.
+let throttledUntil = 0;
+
+export class SyncThrottledError extends Error {
+  constructor(public retryAfterMs: number) {
+    super(`Sync is rate limited, retry in ${Math.ceil(retryAfterMs / 1000)}s`);
+  }
+}
+
+function checkThrottled(res: Response) {
+  if (res.status !== 429 && res.status !== 503) return;
+  const seconds = parseInt(res.headers.get("Retry-After") ?? "", 10);
+  const retryAfterMs = (Number.isFinite(seconds) ? seconds : 5) * 1000;
+  throttledUntil = Date.now() + retryAfterMs;
+  throw new SyncThrottledError(retryAfterMs);
+}
 
 async function getLastSyncMs() {
   const v = await AsyncStorage.getItem(LAST_SYNC_KEY);
@@ -13,37 +43,131 @@ async function setLastSyncMs(ms: number) {
   await AsyncStorage.setItem(LAST_SYNC_KEY, String(ms));
 }
 
-async function pullChanges(token: string, sinceMs: number) {
-  const res = await fetch(`${API_URL}/sync/pull?since=${sinceMs}`, {
-    method: "GET",
-    headers: {
-      Authorization: `Bearer ${token}`,
-    },
-  });
+async function getSyncCursor() {
+  return AsyncStorage.getItem(SYNC_CURSOR_KEY);
+}
 
-  if (!res.ok) {
-    const text = await res.text();
-    throw new Error(text);
-  }
+async function setSyncCursor(cursor: string) {
+  await AsyncStorage.setItem(SYNC_CURSOR_KEY, cursor);
+}
 
-  const data = await res.json();
+// A resync that keeps getting 410 (compaction running while we page) gives
+// up after this many fresh starts instead of looping.
+const MAX_RESYNC_ATTEMPTS = 3;
 
-  const workouts = data.workouts ?? [];
-  for (const w of workouts) {
-    // If your local UI should hide deleted workouts later, we’ll handle that in Step 4.
-    await upsertLocalWorkout(w);
+async function pullChanges(token: string, sinceMs: number) {
+  // A resync that was cut short starts over from the beginning.
+  let resync = (await AsyncStorage.getItem(RESYNC_KEY)) !== null;
+  let cursor = resync ? null : await getSyncCursor();
+  let pulled = 0;
+  let resyncAttempts = 0;
+  if (resync) {
+    sinceMs = 0;
+    await beginResync();
+  }
+  // ETag of the last fully caught-up pull: while nothing changed the server
+  // answers 304 without looking at any workouts.
+  let etag = cursor ? await AsyncStorage.getItem(SYNC_ETAG_KEY) : null;
+
+  // The server pages its changes; keep going until it says we're caught up.
+  while (true) {
+    const query = cursor ? `cursor=${encodeURIComponent(cursor)}` : `since=${sinceMs}`;
+    const headers: Record<string, string> = { Authorization: `Bearer ${token}` };
+    if (etag) headers["If-None-Match"] = etag;
+    const res = await fetch(`${API_URL}/sync/pull?${query}`, {
+      method: "GET",
+      headers,
+    });
+    etag = null;
+
+    if (res.status === 304) break;
+    checkThrottled(res);
+
+    if (res.status === 410 && resyncAttempts < MAX_RESYNC_ATTEMPTS) {
+      // We were offline longer than the server keeps deletes around:
+      // pull everything from scratch and reconcile at the end.
+      resync = true;
+      resyncAttempts++;
+      cursor = null;
+      sinceMs = 0;
+      await AsyncStorage.multiRemove([SYNC_CURSOR_KEY, SYNC_ETAG_KEY]);
+      await AsyncStorage.setItem(RESYNC_KEY, "1");
+      await beginResync();
+      continue;
+    }
+
+    if (!res.ok) {
+      const text = await res.text();
+      throw new Error(text);
+    }
+
+    const data = await res.json();
+
+    const workouts = data.workouts ?? [];
+    for (const w of workouts) {
+      // If your local UI should hide deleted workouts later, we’ll handle that in Step 4.
+      await upsertLocalWorkout(w);
+    }
+    // Sets come after workouts so their parent rows already exist locally.
+    const sets = data.sets ?? [];
+    for (const s of sets) {
+      await upsertLocalWorkoutSet(s);
+    }
+    pulled += workouts.length + sets.length;
+    if (resync) {
+      await markResyncSeen([...workouts, ...sets].map((r: { id: string }) => r.id));
+    }
+
+    if (data.next_cursor) cursor = data.next_cursor;
+    // During a resync the cursor is only saved once every page is in.
+    if (!resync) {
+      await setLastSyncMs(data.server_time_ms ?? Date.now());
+      if (data.next_cursor) await setSyncCursor(data.next_cursor);
+    }
+
+    if (!data.has_more) {
+      if (resync) {
+        await finishResync();
+        await setLastSyncMs(data.server_time_ms ?? Date.now());
+        if (cursor) await setSyncCursor(cursor);
+        await AsyncStorage.removeItem(RESYNC_KEY);
+      }
+      const pageEtag = res.headers.get("ETag");
+      if (pageEtag) await AsyncStorage.setItem(SYNC_ETAG_KEY, pageEtag);
+      break;
+    }
   }
 
-  const serverTime = data.server_time_ms ?? Date.now();
-  await setLastSyncMs(serverTime);
+  return { pulled, resync };
+}
 
-  return data;
+// With the server's push queue on, push answers 202 and applies the ops
+// shortly after; ask how they went. Ops still queued (or unknown to the
+// server) stay pending and are resent with the next sync, which the server
+// acknowledges without queueing them twice.
+async function settleQueuedOps(token: string, opIds: string[]) {
+  if (opIds.length === 0) return;
+  const query = opIds.map((id) => `op_id=${encodeURIComponent(id)}`).join("&");
+  const res = await fetch(`${API_URL}/sync/ops?${query}`, {
+    headers: { Authorization: `Bearer ${token}` },
+  });
+  checkThrottled(res);
+  if (!res.ok) throw new Error(await res.text());
+  const data: { ops: { op_id: string; status: string }[] } = await res.json();
+
+  const idsWith = (...statuses: string[]) =>
+    data.ops.filter((o) => statuses.includes(o.status)).map((o) => o.op_id);
+  // A conflict means the server's version won; the pull brings it down.
+  await markOpsDone(idsWith("applied", "conflict"));
+  await markOpsFailed(idsWith("failed"));
 }
 
 export async function syncNow(token: string) {
+  if (Date.now() < throttledUntil) throw new SyncThrottledError(throttledUntil - Date.now());
   const sinceMs = await getLastSyncMs();
 
   // --- PUSH ---
+  let queued: string[] = [];
   const pending = await getPendingOps(50);
   if (pending.length) {
     const ops = pending.map((p) => ({
@@ -63,15 +187,66 @@ export async function syncNow(token: string) {
       body: JSON.stringify({ ops }),
     });
 
+    checkThrottled(pushRes);
     if (!pushRes.ok) throw new Error(await pushRes.text());
     const pushData = await pushRes.json();
 
-    await markOpsDone(pushData.applied_op_ids ?? []);
+    if (pushRes.status === 202) {
+      queued = pushData.accepted_op_ids ?? [];
+      // Another user already has this op_id; resending it won't help.
+      await markOpsFailed((pushData.rejected ?? []).map((f: { op_id: string }) => f.op_id));
+    } else {
+      await markOpsDone(pushData.applied_op_ids ?? []);
+      // Rejected payloads won't get better on retry; park them instead of
+      // resending them with every sync.
+      await markOpsFailed((pushData.failed ?? []).map((f: { op_id: string }) => f.op_id));
+    }
   }
 
   // --- PULL ---
   const pullData = await pullChanges(token, sinceMs);
+  await settleQueuedOps(token, queued);
 
-  return { ok: true, pulled: pullData.workouts?.length ?? 0 };
+  return { ok: true, pulled: pullData.pulled };
 }
 
+// Keeps a WebSocket open to /sync/subscribe and calls onChange whenever the
+// server's change ETag differs from the one our last pull stored, i.e. when
+// another device pushed. Reconnects with backoff; returns a function that
+// closes it for good.
+export function subscribeToChanges(token: string, onChange: () => void): () => void {
+  const url = `${API_URL.replace(/^http/, "ws")}/sync/subscribe?token=${encodeURIComponent(token)}`;
+  let ws: WebSocket | null = null;
+  let stopped = false;
+  let retryMs = 1000;
+  let retryTimer: ReturnType<typeof setTimeout> | null = null;
+
+  const connect = () => {
+    ws = new WebSocket(url);
+    ws.onopen = () => {
+      retryMs = 1000;
+    };
+    ws.onmessage = async (event) => {
+      try {
+        const msg = JSON.parse(String(event.data));
+        if (msg.kind !== "changed") return;
+        if (msg.etag !== (await AsyncStorage.getItem(SYNC_ETAG_KEY))) onChange();
+      } catch {
+        // ignore malformed frames
+      }
+    };
+    ws.onclose = () => {
+      ws = null;
+      if (stopped) return;
+      retryTimer = setTimeout(connect, retryMs);
+      retryMs = Math.min(retryMs * 2, 60_000);
+    };
+  };
+
+  connect();
+  return () => {
+    stopped = true;
+    if (retryTimer) clearTimeout(retryTimer);
+    ws?.close();
+  };
+}